@@ -16,6 +16,22 @@ import argparse
 import json
 import re
 
+try:
+    from ifcb_stage_timing import recording, stage
+except ImportError:  # timing is opt-in; run untimed without the module
+    from contextlib import nullcontext
+    from types import SimpleNamespace
+
+    _NO_STAGE = SimpleNamespace(add=lambda rows=None, bytes_read=None: None)
+
+    def stage(*args, **kwargs):
+        return nullcontext(_NO_STAGE)
+
+    def recording(callback=None, enabled=True):
+        if enabled:
+            raise ImportError("stage timing needs ifcb_stage_timing.py on the import path")
+        return nullcontext()
+
 
 CANONICAL_ADC_HEADERS: List[str] = [
     "trigger#",
@@ -327,12 +343,13 @@ def process_hdr_directory(
 
     for hdr_file in hdr_files:
         try:
-            report = parse_and_standardize_hdr(
-                hdr_path=hdr_file,
-                canonical_tokens=canonical_tokens,
-                alias_map=alias_map,
-                strict=strict,
-            )
+            with stage("hdr_parse", bin=hdr_file.stem, rows=1, path=hdr_file):
+                report = parse_and_standardize_hdr(
+                    hdr_path=hdr_file,
+                    canonical_tokens=canonical_tokens,
+                    alias_map=alias_map,
+                    strict=strict,
+                )
         except HeaderMappingError as exc:
             if strict:
                 raise
@@ -359,18 +376,20 @@ def process_hdr_directory(
 
         if write_standard_to_hdr:
             if report.is_valid:
-                action = append_standard_header_to_hdr(
-                    hdr_path=hdr_file,
-                    canonical_tokens=canonical_tokens,
-                    strict=strict,
-                )
+                with stage("hdr_write_standard", bin=hdr_file.stem):
+                    action = append_standard_header_to_hdr(
+                        hdr_path=hdr_file,
+                        canonical_tokens=canonical_tokens,
+                        strict=strict,
+                    )
                 report.standard_header_action = action
             else:
                 report.standard_header_action = "none"
 
         if report_dir_path:
-            out_path = report_dir_path / f"{hdr_file.stem}_adc_header_report.json"
-            out_path.write_text(json.dumps(report.to_json_dict(), indent=2), encoding="utf-8")
+            with stage("hdr_report_write", bin=hdr_file.stem):
+                out_path = report_dir_path / f"{hdr_file.stem}_adc_header_report.json"
+                out_path.write_text(json.dumps(report.to_json_dict(), indent=2), encoding="utf-8")
 
     if report_dir_path:
         summary = summarize_reports(reports)
@@ -478,6 +497,7 @@ def _cli() -> None:
             "Never overwrites an existing differing standard line."
         ),
     )
+    parser.add_argument("--timing", type=str, default=None, help="Write per-stage timings to this .json or .csv")
 
     args = parser.parse_args()
 
@@ -497,15 +517,18 @@ def _cli() -> None:
         print(json.dumps(report.to_json_dict(), indent=2))
         return
 
-    reports = process_hdr_directory(
-        directory=args.directory,
-        pattern=args.pattern,
-        recursive=recursive,
-        strict=strict,
-        report_dir=args.report_dir,
-        write_standard_to_hdr=args.write_standard_to_hdr,
-    )
+    with recording(enabled=bool(args.timing)) as rec:
+        reports = process_hdr_directory(
+            directory=args.directory,
+            pattern=args.pattern,
+            recursive=recursive,
+            strict=strict,
+            report_dir=args.report_dir,
+            write_standard_to_hdr=args.write_standard_to_hdr,
+        )
     print(json.dumps(summarize_reports(reports), indent=2))
+    if args.timing:
+        rec.save(args.timing)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""Fake-writer check for ``ifcb_live_watch``.
+
+Writes a synthetic bin with ``ifcb_synthetic_corpus.write_bin`` into a staging
+folder, then replays it into a watched folder in arbitrary byte chunks (so
+rows are regularly split mid-line), polls ``WatchFolder`` after every chunk,
+and compares the running totals against ``pd.read_csv`` of the finished file.
+Also covers a header whose ``ADCFileFormat:`` line is not written yet, an .adc
+that is truncated mid-run, and a class CSV that appears empty, then
+half-written, then complete.
+
+Usage:
+    python check_ifcb_live_watch.py
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import math
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ifcb_live_watch import ROI_GEOMETRY_COLUMNS, WatchFolder, class_counts_from_csv
+from ifcb_synthetic_corpus import CorpusConfig, default_class_names, write_bin
+
+
+PID = "D20240101T000000_IFCB999"
+
+
+def _expected(adc_bytes: bytes, columns) -> dict:
+    with tempfile.NamedTemporaryFile("wb", suffix=".adc", delete=False) as f:
+        f.write(adc_bytes)
+    try:
+        df = pd.read_csv(f.name, header=None, names=columns)
+    finally:
+        Path(f.name).unlink()
+    zero = (df[list(ROI_GEOMETRY_COLUMNS)] == 0).all(axis=1)
+    return {
+        "n_rows": len(df),
+        "n_zero_roi": int(zero.sum()),
+        "n_triggers": int(df["trigger#"].iloc[-1]),
+        "runtime_final": float(df["RunTime"].iloc[-1]),
+        "inhibittime_final": float(df["InhibitTime"].iloc[-1]),
+    }
+
+
+def _assert_matches(summary, expected: dict) -> None:
+    for key, want in expected.items():
+        got = getattr(summary, key)
+        if isinstance(want, float):
+            assert math.isclose(got, want, rel_tol=1e-12), (key, got, want)
+        else:
+            assert got == want, (key, got, want)
+
+
+def _append_in_chunks(path: Path, data: bytes, rng: np.random.Generator, watcher: WatchFolder) -> None:
+    pos = 0
+    while pos < len(data):
+        step = int(rng.integers(1, 400))
+        with open(path, "ab") as f:
+            f.write(data[pos:pos + step])
+        pos += step
+        watcher.poll()
+
+
+def _finished_bin(staging: Path, seed: int) -> dict:
+    """Bytes of one complete bin (.hdr, .adc, class CSV) written by ``write_bin``."""
+    cfg = CorpusConfig(rois_per_bin=300, header_style_weights={"canonical": 1.0})
+    write_bin(staging, PID, cfg, np.random.SeedSequence(seed), default_class_names(5))
+    return {
+        "hdr": (staging / f"{PID}.hdr").read_bytes(),
+        "adc": (staging / f"{PID}.adc").read_bytes(),
+        "class": (staging / f"{PID}_class_vNone.csv").read_bytes(),
+    }
+
+
+def run_check(seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+
+    with tempfile.TemporaryDirectory() as staging, tempfile.TemporaryDirectory() as tmp:
+        finished = _finished_bin(Path(staging), seed)
+        adc_bytes = finished["adc"]
+        folder = Path(tmp)
+        hdr_path = folder / f"{PID}.hdr"
+        adc_path = folder / f"{PID}.adc"
+        class_path = folder / f"{PID}_class_vNone.csv"
+
+        watcher = WatchFolder(folder)
+
+        # Header without its ADCFileFormat line yet: the bin is skipped, not fatal.
+        hdr_path.write_text("HeaderVersion: 1\n")
+        adc_path.write_bytes(adc_bytes[:1000])
+        assert watcher.poll() == []
+        assert PID not in watcher.summaries
+        hdr_path.write_bytes(finished["hdr"])
+        watcher.poll()
+        assert PID in watcher.summaries
+
+        # Grow the rest of the file in partial-line chunks.
+        _append_in_chunks(adc_path, adc_bytes[1000:], rng, watcher)
+        watcher.poll()
+        columns = watcher.tails[PID].columns
+        _assert_matches(watcher.summaries[PID], _expected(adc_bytes, columns))
+
+        # Truncate to the first 20 rows: totals are rebuilt, not added to.
+        lines = adc_bytes.splitlines(keepends=True)
+        short = b"".join(lines[:20])
+        adc_path.write_bytes(short)
+        watcher.poll()
+        _assert_matches(watcher.summaries[PID], _expected(short, columns))
+
+        # Re-grow to the full file after truncation.
+        _append_in_chunks(adc_path, adc_bytes[len(short):], rng, watcher)
+        _assert_matches(watcher.summaries[PID], _expected(adc_bytes, columns))
+
+        # Class CSV: empty, then half-written, then complete.
+        class_path.write_text("")
+        watcher.poll()
+        assert watcher.summaries[PID].class_file is None
+
+        class_bytes = finished["class"]
+        class_lines = class_bytes.splitlines(keepends=True)
+        class_path.write_bytes(b"".join(class_lines[: len(class_lines) // 2]))
+        watcher.poll()
+        partial = sum(watcher.summaries[PID].class_counts.values())
+        assert partial == len(class_lines) // 2 - 1, partial
+
+        class_path.write_bytes(class_bytes)
+        watcher.poll()
+        want = class_counts_from_csv(class_path)
+        assert watcher.summaries[PID].class_counts == want
+        assert sum(want.values()) == len(class_lines) - 1
+
+    print("ifcb_live_watch check passed")
+
+
+if __name__ == "__main__":
+    run_check()
@@ -14,8 +14,27 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 import re
+import sys
 import pandas as pd
 
+# Optional stage timing lives in the parent Utils directory; the script runs without it
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+try:
+    from ifcb_stage_timing import recording, stage
+except ImportError:  # timing is opt-in; run untimed without the module
+    from contextlib import nullcontext
+    from types import SimpleNamespace
+
+    _NO_STAGE = SimpleNamespace(add=lambda rows=None, bytes_read=None: None)
+
+    def stage(*args, **kwargs):
+        return nullcontext(_NO_STAGE)
+
+    def recording(callback=None, enabled=True):
+        if enabled:
+            raise ImportError("stage timing needs ifcb_stage_timing.py on the import path")
+        return nullcontext()
+
 
 def parse_sample_datetime_from_filename(path: Path) -> str | None:
     """Extract datetime like D20230727T030526 from IFCB filenames."""
@@ -40,7 +59,14 @@ def get_metadata_and_class_columns(df: pd.DataFrame, class_map: pd.DataFrame) ->
 
 
 def process_one_file(path: Path, class_map: pd.DataFrame, include_group_scores: bool = False) -> pd.DataFrame:
-    df = pd.read_csv(path)
+    with stage("class_read_csv", bin=path.stem, path=path) as st:
+        df = pd.read_csv(path)
+        st.add(rows=len(df))
+    with stage("class_assign", bin=path.stem, rows=len(df)):
+        return _assign_classes(df, path, class_map, include_group_scores)
+
+
+def _assign_classes(df: pd.DataFrame, path: Path, class_map: pd.DataFrame, include_group_scores: bool) -> pd.DataFrame:
     metadata_cols, class_cols = get_metadata_and_class_columns(df, class_map)
 
     scores = df[class_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
@@ -85,13 +111,15 @@ def build_master(raw_dir: Path, map_path: Path, output_path: Path, file_glob: st
         raise FileNotFoundError(f"No files matched {raw_dir / file_glob}")
 
     pieces = [process_one_file(path, class_map) for path in files]
-    master = pd.concat(pieces, ignore_index=True)
+    with stage("master_concat"):
+        master = pd.concat(pieces, ignore_index=True)
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    if output_path.suffix.lower() == ".parquet":
-        master.to_parquet(output_path, index=False)
-    else:
-        master.to_csv(output_path, index=False)
+    with stage("master_write", rows=len(master)):
+        if output_path.suffix.lower() == ".parquet":
+            master.to_parquet(output_path, index=False)
+        else:
+            master.to_csv(output_path, index=False)
     return master
 
 
@@ -101,9 +129,13 @@ def main() -> None:
     parser.add_argument("--map", default="config/class_taxonomy_map.csv", type=Path)
     parser.add_argument("--output", default="data/processed/master_particles.parquet", type=Path)
     parser.add_argument("--glob", default="*.csv")
+    parser.add_argument("--timing", default=None, type=Path, help="Write per-stage timings to this .json or .csv")
     args = parser.parse_args()
 
-    master = build_master(args.raw_dir, args.map, args.output, args.glob)
+    with recording(enabled=bool(args.timing)) as rec:
+        master = build_master(args.raw_dir, args.map, args.output, args.glob)
+    if args.timing:
+        rec.save(args.timing)
     print(f"Wrote {len(master):,} rows x {len(master.columns):,} columns to {args.output}")
     print(master["taxonomic_group"].value_counts(dropna=False).to_string())
 
@@ -0,0 +1,259 @@
+"""Byte-offset sidecar index for random access into IFCB ``.adc`` files.
+
+Spot checks (matched ROI targets, first-ROI and duplicate-ROI QC) need a few
+rows out of each bin but currently re-parse the whole ADC. An ``AdcIndex``
+records where every row starts, so fetching RoiNumbers or ranges is a handful
+of seeks plus a parse of just those lines.
+
+Design goals:
+- Build with one vectorized newline scan over the raw bytes.
+- Store the index next to the ADC as ``<pid>.adc.idx.npz`` together with the
+  ADC size and mtime, and rebuild automatically when the ADC changes.
+- Row numbering matches ``pd.read_csv(header=None)`` (blank lines skipped),
+  so RoiNumber is the 1-based ADC line used everywhere else.
+- Adjacent requested rows are coalesced into a single read.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import io
+
+import numpy as np
+import pandas as pd
+
+from ifcb_bin_probe import adc_column_names
+from ifcb_roi_reader import find_bin_file, parse_roi_pid
+from ifcb_stage_timing import stage
+
+
+INDEX_SUFFIX = ".idx.npz"
+
+
+def index_path_for(adc_path: str | Path) -> Path:
+    adc_path = Path(adc_path)
+    return adc_path.with_name(adc_path.name + INDEX_SUFFIX)
+
+
+def scan_line_offsets(data: bytes | np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """``(starts, ends)`` byte offsets of every non-blank line (ends exclusive, no newline)."""
+    buf = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    newlines = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate([[0], newlines + 1])
+    ends = np.concatenate([newlines, [len(buf)]])
+    # Drop a trailing \r (Windows line endings) from the line length
+    if len(buf):
+        cr = (ends > starts) & (buf[np.maximum(ends - 1, 0)] == ord("\r"))
+        ends = ends - cr
+    keep = ends > starts
+    return starts[keep].astype(np.int64), ends[keep].astype(np.int64)
+
+
+class AdcIndex:
+    """Row offsets for one ``.adc`` file."""
+
+    def __init__(self, adc_path: str | Path, starts: np.ndarray, ends: np.ndarray, size: int, mtime_ns: int):
+        self.adc_path = Path(adc_path)
+        self.starts = starts
+        self.ends = ends
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self._columns: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def build(cls, adc_path: str | Path) -> "AdcIndex":
+        adc_path = Path(adc_path)
+        st = adc_path.stat()
+        with stage("adc_index_build", bin=adc_path.stem, bytes_read=st.st_size) as timing:
+            starts, ends = scan_line_offsets(adc_path.read_bytes())
+            timing.add(rows=len(starts))
+        return cls(adc_path, starts, ends, st.st_size, st.st_mtime_ns)
+
+    def save(self, index_path: Optional[str | Path] = None) -> Path:
+        index_path = Path(index_path) if index_path else index_path_for(self.adc_path)
+        tmp = index_path.with_name(index_path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, starts=self.starts, ends=self.ends, size=self.size, mtime_ns=self.mtime_ns)
+        tmp.replace(index_path)
+        return index_path
+
+    @classmethod
+    def load(cls, adc_path: str | Path, index_path: Optional[str | Path] = None) -> Optional["AdcIndex"]:
+        """Saved index, or None if missing or stale (ADC size/mtime changed)."""
+        adc_path = Path(adc_path)
+        index_path = Path(index_path) if index_path else index_path_for(adc_path)
+        if not index_path.exists():
+            return None
+        st = adc_path.stat()
+        with np.load(index_path) as z:
+            if int(z["size"]) != st.st_size or int(z["mtime_ns"]) != st.st_mtime_ns:
+                return None
+            return cls(adc_path, z["starts"], z["ends"], int(z["size"]), int(z["mtime_ns"]))
+
+    @classmethod
+    def open(cls, adc_path: str | Path, write: bool = True) -> "AdcIndex":
+        """Load the sidecar, building (and by default saving) it if needed."""
+        index = cls.load(adc_path)
+        if index is None:
+            index = cls.build(adc_path)
+            if write:
+                try:
+                    index.save()
+                except OSError:
+                    pass  # read-only archive: use the in-memory index
+        return index
+
+    # ---- reads ------------------------------------------------------------
+
+    def columns(self, hdr_path: Optional[str | Path] = None, alias_map: Optional[Dict[str, str]] = None) -> List[str]:
+        if self._columns is None or hdr_path is not None or alias_map is not None:
+            hdr_path = Path(hdr_path) if hdr_path else self.adc_path.with_suffix(".hdr")
+            self._columns = adc_column_names(hdr_path, alias_map=alias_map)
+        return self._columns
+
+    def read_lines(self, roi_numbers: Iterable[int]) -> List[bytes]:
+        """Raw lines for 1-based ``roi_numbers`` (in the order given)."""
+        wanted = np.asarray(list(roi_numbers), dtype=np.int64)
+        if len(wanted) and (wanted.min() < 1 or wanted.max() > len(self)):
+            raise IndexError(f"RoiNumber out of range 1..{len(self)} in {self.adc_path.name}")
+        if len(wanted) == 0:
+            return []
+
+        rows = np.unique(wanted - 1)
+        # Coalesce consecutive rows into one read each
+        breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+        lines: Dict[int, bytes] = {}
+        with open(self.adc_path, "rb") as f:
+            for run in np.split(rows, breaks):
+                lo, hi = int(self.starts[run[0]]), int(self.ends[run[-1]])
+                f.seek(lo)
+                chunk = f.read(hi - lo)
+                for r in run:
+                    lines[int(r)] = chunk[self.starts[r] - lo:self.ends[r] - lo]
+        return [lines[int(r)] for r in wanted - 1]
+
+    def read_rows(
+        self,
+        roi_numbers: Iterable[int],
+        hdr_path: Optional[str | Path] = None,
+        alias_map: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """Parsed rows with canonical column names plus ``RoiNumber``."""
+        numbers = list(roi_numbers)
+        columns = self.columns(hdr_path, alias_map)
+        lines = self.read_lines(numbers)
+        if not lines:
+            return pd.DataFrame(columns=["RoiNumber", *columns])
+        df = pd.read_csv(io.BytesIO(b"\n".join(lines)), header=None, skipinitialspace=True)
+        df.columns = [columns[i] if i < len(columns) else f"col{i}" for i in range(df.shape[1])]
+        df.insert(0, "RoiNumber", numbers)
+        return df
+
+    def read_range(
+        self,
+        start: int,
+        stop: int,
+        hdr_path: Optional[str | Path] = None,
+        alias_map: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """RoiNumbers ``start`` through ``stop`` inclusive (clipped to the file)."""
+        start, stop = max(1, int(start)), min(len(self), int(stop))
+        return self.read_rows(range(start, stop + 1), hdr_path, alias_map)
+
+
+def fetch_adc_rows(
+    roi_pids: Iterable[str],
+    data_dir: str | Path,
+    write_index: bool = True,
+    alias_map: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """ADC rows for ROI pids across many bins, one index open per bin.
+
+    Returns one row per ROI pid (in request order within each bin) with a
+    ``pid`` column (the ROI pid) and ``bin_pid``. Missing bins raise
+    FileNotFoundError.
+    """
+    by_bin: Dict[str, List[Tuple[str, int]]] = {}
+    for roi_pid in roi_pids:
+        bin_pid, roi_number = parse_roi_pid(roi_pid)
+        by_bin.setdefault(bin_pid, []).append((roi_pid, roi_number))
+
+    frames = []
+    for bin_pid, wanted in by_bin.items():
+        adc_path = find_bin_file(data_dir, bin_pid, ".adc")
+        if adc_path is None:
+            raise FileNotFoundError(f"no .adc file for {bin_pid} under {data_dir}")
+        index = AdcIndex.open(adc_path, write=write_index)
+        with stage("adc_index_fetch", bin=bin_pid, rows=len(wanted)):
+            df = index.read_rows([n for _, n in wanted], alias_map=alias_map)
+        df.insert(0, "bin_pid", bin_pid)
+        df.insert(0, "pid", [p for p, _ in wanted])
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["pid", "bin_pid", "RoiNumber"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _build_one(adc_path: Path) -> Tuple[str, int, bool]:
+    index = AdcIndex.load(adc_path)
+    if index is not None:
+        return adc_path.stem, len(index), False
+    index = AdcIndex.build(adc_path)
+    try:
+        index.save()
+    except OSError:
+        return adc_path.stem, len(index), False  # read-only archive; nothing written
+    return adc_path.stem, len(index), True
+
+
+def build_directory_indexes(
+    directory: str | Path,
+    pattern: str = "*.adc",
+    recursive: bool = True,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Build missing or stale sidecars for every ``.adc``; one row per file.
+
+    ``built`` is False where the sidecar was already fresh or could not be
+    written (e.g. a read-only archive).
+    """
+    directory = Path(directory)
+    globber = directory.rglob if recursive else directory.glob
+    paths = sorted(globber(pattern))
+    if max_workers == 1:
+        rows = [_build_one(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            rows = list(pool.map(_build_one, paths, chunksize=16))
+    return pd.DataFrame(rows, columns=["pid", "n_rows", "built"])
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Build .adc row-offset indexes or fetch rows by ROI pid")
+    parser.add_argument("directory", type=str, help="Directory containing .adc/.hdr files")
+    parser.add_argument("roi_pids", nargs="*", help="ROI pids to fetch (omit to only build indexes)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", type=str, default=None, help="CSV path for fetched rows")
+    args = parser.parse_args()
+
+    if not args.roi_pids:
+        summary = build_directory_indexes(args.directory, max_workers=args.workers)
+        print(f"Indexed {len(summary):,} ADC files ({int(summary['built'].sum()):,} built or refreshed)")
+        return
+
+    rows = fetch_adc_rows(args.roi_pids, args.directory)
+    if args.output:
+        rows.to_csv(args.output, index=False)
+        print(f"Wrote {len(rows):,} rows to {args.output}")
+    else:
+        print(rows.to_string(index=False))
+
+
+if __name__ == "__main__":
+    _cli()
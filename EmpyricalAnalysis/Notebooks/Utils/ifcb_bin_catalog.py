@@ -0,0 +1,359 @@
+"""Local SQLite catalog of IFCB bins with incremental dashboard sync.
+
+The DashboardDataPull and PIDListBuilder helpers call ``/api/export_metadata``
+for every query and filter in pandas afterwards. This module keeps one indexed
+table of bins per catalog file so PID lists can be built offline.
+
+Design goals:
+- One row per (dataset, pid): instrument, sample_time, skip flag, local paths.
+- Incremental sync: only request bins newer than the last synced sample_time;
+  an earlier ``start`` than any previous sync backfills from ``start``.
+- Indexed queries on (dataset, sample_time) and sample_time.
+- Downloaders record local file paths so later runs can skip existing files.
+
+Times are stored as UTC ISO strings (``YYYY-MM-DDTHH:MM:SSZ``), which sort
+lexicographically in time order, so range queries use the index directly.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+import argparse
+import re
+import sqlite3
+
+import pandas as pd
+import requests
+
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+FILE_KINDS = ("adc", "hdr", "class")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bins (
+    dataset     TEXT NOT NULL,
+    pid         TEXT NOT NULL,
+    instrument  TEXT,
+    sample_time TEXT NOT NULL,
+    skip        INTEGER NOT NULL DEFAULT 0,
+    adc_path    TEXT,
+    hdr_path    TEXT,
+    class_path  TEXT,
+    PRIMARY KEY (dataset, pid)
+);
+CREATE INDEX IF NOT EXISTS idx_bins_dataset_time ON bins (dataset, sample_time);
+CREATE INDEX IF NOT EXISTS idx_bins_time ON bins (sample_time);
+CREATE TABLE IF NOT EXISTS sync_state (
+    base_url         TEXT NOT NULL,
+    dataset          TEXT NOT NULL,
+    last_sample_time TEXT,
+    last_sync_at     TEXT,
+    synced_from      TEXT,
+    PRIMARY KEY (base_url, dataset)
+);
+"""
+
+# fetch(base_url, dataset, start, end, include_skip) -> export_metadata DataFrame
+MetadataFetcher = Callable[[str, str, str, str, bool], pd.DataFrame]
+
+
+def fetch_export_metadata(
+    base_url: str,
+    dataset: str,
+    start: str,
+    end: str,
+    include_skip: bool = True,
+    timeout: int = 60,
+) -> pd.DataFrame:
+    """Call ``/api/export_metadata/<dataset>`` and return the CSV as a DataFrame."""
+    url = f"{base_url.rstrip('/')}/api/export_metadata/{dataset}"
+    params = {
+        "start_date": start,
+        "end_date": end,
+        "include_skip": str(include_skip).lower(),
+    }
+    r = requests.get(url, params=params, timeout=timeout)
+    r.raise_for_status()
+    df = pd.read_csv(StringIO(r.text))
+    if "sample_time" not in df.columns or "pid" not in df.columns:
+        raise ValueError(
+            f"Expected 'sample_time' and 'pid' columns from {url}, got: {df.columns.tolist()}"
+        )
+    return df
+
+
+def instrument_from_pid(pid: str) -> Optional[str]:
+    """Extract the instrument (e.g. IFCB124) from a pid like D20240418T084427_IFCB124."""
+    match = re.search(r"_(IFCB\d+)", str(pid))
+    return match.group(1) if match else None
+
+
+def _to_time_text(value) -> str:
+    return pd.to_datetime(value, utc=True).strftime(TIME_FORMAT)
+
+
+def _as_skip_flag(value) -> int:
+    if isinstance(value, str):
+        return int(value.strip().lower() in {"true", "1", "yes", "t"})
+    try:
+        return int(bool(value)) if pd.notna(value) else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+class BinCatalog:
+    """SQLite-backed bin catalog. Use as a context manager or call ``close()``."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(sync_state)")}
+        if "synced_from" not in columns:
+            # Catalogs created before synced_from was tracked; NULL forces one backfill
+            with self.conn:
+                self.conn.execute("ALTER TABLE sync_state ADD COLUMN synced_from TEXT")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "BinCatalog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- writes -----------------------------------------------------------
+
+    def upsert_bins(self, dataset: str, bins_df: pd.DataFrame) -> int:
+        """Insert or update bins from an export_metadata-style frame.
+
+        Local paths already recorded for a bin are preserved.
+        """
+        if bins_df.empty:
+            return 0
+        times = pd.to_datetime(bins_df["sample_time"], utc=True, errors="coerce")
+        keep = times.notna()
+        pids = bins_df.loc[keep, "pid"].astype(str)
+        times = times[keep].dt.strftime(TIME_FORMAT)
+
+        if "instrument" in bins_df.columns:
+            instruments = bins_df.loc[keep, "instrument"].astype(str)
+        else:
+            instruments = pids.map(instrument_from_pid)
+        if "skip" in bins_df.columns:
+            skips = bins_df.loc[keep, "skip"].map(_as_skip_flag)
+        else:
+            skips = pd.Series(0, index=pids.index)
+
+        records = list(zip([dataset] * len(pids), pids, instruments, times, skips))
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO bins (dataset, pid, instrument, sample_time, skip)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (dataset, pid) DO UPDATE SET
+                    instrument = excluded.instrument,
+                    sample_time = excluded.sample_time,
+                    skip = excluded.skip
+                """,
+                records,
+            )
+        return len(records)
+
+    def record_local_file(self, dataset: str, pid: str, kind: str, path: str | Path) -> None:
+        """Store the local path of one downloaded file (kind: adc, hdr or class)."""
+        if kind not in FILE_KINDS:
+            raise ValueError(f"kind must be one of {FILE_KINDS}, got {kind!r}")
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE bins SET {kind}_path = ? WHERE dataset = ? AND pid = ?",
+                (str(path), dataset, pid),
+            )
+
+    def register_local_directory(
+        self,
+        dataset: str,
+        directory: str | Path,
+        class_suffix: str = "_class_vNone.csv",
+    ) -> int:
+        """Record paths for every cataloged bin of ``dataset`` found under a directory."""
+        directory = Path(directory)
+        suffixes = {"adc": ".adc", "hdr": ".hdr", "class": class_suffix}
+        found: Dict[str, Dict[str, Path]] = {}
+        for kind, suffix in suffixes.items():
+            for path in directory.rglob(f"*{suffix}"):
+                pid = path.name[: -len(suffix)]
+                found.setdefault(pid, {})[kind] = path
+
+        updated = 0
+        with self.conn:
+            for pid, paths in found.items():
+                for kind, path in paths.items():
+                    cur = self.conn.execute(
+                        f"UPDATE bins SET {kind}_path = ? WHERE dataset = ? AND pid = ?",
+                        (str(path), dataset, pid),
+                    )
+                    updated += cur.rowcount
+        return updated
+
+    # ---- sync -------------------------------------------------------------
+
+    def last_synced_time(self, base_url: str, dataset: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT last_sample_time FROM sync_state WHERE base_url = ? AND dataset = ?",
+            (base_url.rstrip("/"), dataset),
+        ).fetchone()
+        return row[0] if row else None
+
+    def sync(
+        self,
+        base_url: str,
+        dataset: str,
+        start: str,
+        end: Optional[str] = None,
+        include_skip: bool = True,
+        fetch: Optional[MetadataFetcher] = None,
+        full: bool = False,
+    ) -> int:
+        """Fetch bins newer than the last sync (or ``start`` on first sync).
+
+        The request window starts at the last synced sample_time (inclusive, so
+        bins sharing that second are not lost) and ends at ``end`` or now.
+        If ``start`` is earlier than the start of every previous sync for this
+        dataset, or ``full`` is set, the window starts at ``start`` instead so
+        the earlier range is backfilled. Returns the number of rows written.
+        """
+        base_url = base_url.rstrip("/")
+        fetch = fetch or fetch_export_metadata
+        start_text = _to_time_text(start)
+        row = self.conn.execute(
+            "SELECT synced_from, last_sample_time FROM sync_state WHERE base_url = ? AND dataset = ?",
+            (base_url, dataset),
+        ).fetchone()
+        synced_from, last = row if row else (None, None)
+        backfill = full or last is None or synced_from is None or start_text < synced_from
+        window_start = start_text if backfill else max(start_text, last)
+        window_end = _to_time_text(end) if end else datetime.now(timezone.utc).strftime(TIME_FORMAT)
+        # A backfill only extends the synced range if it reaches the old range
+        if synced_from is None or last is None or (start_text < synced_from and window_end >= synced_from):
+            synced_from = start_text
+
+        bins_df = fetch(base_url, dataset, window_start, window_end, include_skip)
+        written = self.upsert_bins(dataset, bins_df)
+
+        newest = self.conn.execute(
+            "SELECT MAX(sample_time) FROM bins WHERE dataset = ?", (dataset,)
+        ).fetchone()[0]
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO sync_state (base_url, dataset, last_sample_time, last_sync_at, synced_from)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (base_url, dataset) DO UPDATE SET
+                    last_sample_time = excluded.last_sample_time,
+                    last_sync_at = excluded.last_sync_at,
+                    synced_from = excluded.synced_from
+                """,
+                (base_url, dataset, newest, datetime.now(timezone.utc).strftime(TIME_FORMAT), synced_from),
+            )
+        return written
+
+    # ---- reads ------------------------------------------------------------
+
+    def query_bins(
+        self,
+        datasets: Optional[str | Iterable[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        include_skip: bool = True,
+        missing_kind: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Return bins in ``[start, end]`` sorted by sample_time, fully offline.
+
+        ``sample_time`` comes back as a UTC datetime column, matching
+        ``get_ifcb_bins_datetime_filtered``. ``missing_kind`` (adc, hdr or
+        class) restricts to bins that have no local file of that kind yet.
+        """
+        clauses: List[str] = []
+        params: List[object] = []
+        if datasets is not None:
+            names = [datasets] if isinstance(datasets, str) else list(datasets)
+            clauses.append(f"dataset IN ({', '.join('?' * len(names))})")
+            params.extend(names)
+        if start is not None:
+            clauses.append("sample_time >= ?")
+            params.append(_to_time_text(start))
+        if end is not None:
+            clauses.append("sample_time <= ?")
+            params.append(_to_time_text(end))
+        if not include_skip:
+            clauses.append("skip = 0")
+        if missing_kind is not None:
+            if missing_kind not in FILE_KINDS:
+                raise ValueError(f"missing_kind must be one of {FILE_KINDS}, got {missing_kind!r}")
+            clauses.append(f"{missing_kind}_path IS NULL")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        df = pd.read_sql_query(
+            f"SELECT * FROM bins {where} ORDER BY sample_time, dataset, pid",
+            self.conn,
+            params=params,
+        )
+        df["sample_time"] = pd.to_datetime(df["sample_time"], utc=True)
+        df["skip"] = df["skip"].astype(bool)
+        return df
+
+    def pids(self, *args, **kwargs) -> List[str]:
+        """Shortcut for ``query_bins(...)["pid"].tolist()``."""
+        return self.query_bins(*args, **kwargs)["pid"].tolist()
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Sync or query a local IFCB bin catalog")
+    parser.add_argument("--db", type=str, required=True, help="Path to the SQLite catalog file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_sync = sub.add_parser("sync", help="Fetch bins newer than the last sync")
+    p_sync.add_argument("--base-url", type=str, default="https://habon-ifcb.whoi.edu")
+    p_sync.add_argument("--dataset", type=str, required=True)
+    p_sync.add_argument("--start", type=str, required=True,
+                        help="Start time for the first sync; an earlier start than before backfills")
+    p_sync.add_argument("--end", type=str, default=None)
+    p_sync.add_argument("--full", action="store_true", help="Re-request the whole window from --start")
+
+    p_query = sub.add_parser("query", help="List cataloged bins")
+    p_query.add_argument("--dataset", type=str, action="append", default=None)
+    p_query.add_argument("--start", type=str, default=None)
+    p_query.add_argument("--end", type=str, default=None)
+    p_query.add_argument("--exclude-skip", action="store_true")
+    p_query.add_argument("--output", type=str, default=None, help="Optional CSV output path")
+
+    args = parser.parse_args()
+
+    with BinCatalog(args.db) as catalog:
+        if args.command == "sync":
+            n = catalog.sync(args.base_url, args.dataset, start=args.start, end=args.end, full=args.full)
+            print(f"Synced {n:,} bins for {args.dataset}")
+            return
+
+        df = catalog.query_bins(
+            datasets=args.dataset,
+            start=args.start,
+            end=args.end,
+            include_skip=not args.exclude_skip,
+        )
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"Wrote {len(df):,} bins to {args.output}")
+        else:
+            print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    _cli()
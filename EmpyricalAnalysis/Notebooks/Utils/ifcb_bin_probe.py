@@ -0,0 +1,291 @@
+"""Cheap per-bin summaries from the first and last rows of IFCB .adc files.
+
+Whole-bin summaries (looktime, final volume analyzed, trigger count) only
+depend on the last ADC row, and first-ROI QC only depends on the first row,
+so there is no need to parse the middle of the file.
+
+Design goals:
+- Read the first row with a bounded prefix read.
+- Read the last row by seeking backwards from end-of-file.
+- Resolve column names through the same alias map used by the header
+  standardizer so legacy ADCFileFormat variants work unchanged.
+- Produce the same summary keys as the full-ingest summaries where possible
+  (``vfinal``, ``inhibittime_final``, ``looktime``).
+
+ROI-type counts (roi0..roiN) need every trigger# in the file and are therefore
+not available from a probe; use the full ingest for those.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import argparse
+import os
+
+import pandas as pd
+
+from adc_header_standardizer import (
+    HeaderMappingError,
+    extract_adcfileformat_line,
+    map_tokens_to_canonical,
+    parse_adc_tokens,
+)
+
+
+# Flow rate used across the notebooks to turn look time into volume (mL).
+SECONDS_PER_ML = 240.0
+
+# First rows are short; a bounded read avoids pulling large files into memory.
+DEFAULT_HEAD_BYTES = 64 * 1024
+DEFAULT_TAIL_BLOCK = 4 * 1024
+
+
+@dataclass
+class BinProbe:
+    """First/last row summary of one bin, derived without a full parse."""
+
+    pid: str
+    adc_path: str
+    hdr_path: Optional[str]
+    adc_bytes: int
+    first_row: Dict[str, Optional[float]] = field(default_factory=dict)
+    last_row: Dict[str, Optional[float]] = field(default_factory=dict)
+    n_triggers: Optional[int] = None
+    runtime_final: Optional[float] = None
+    inhibittime_final: Optional[float] = None
+    looktime: Optional[float] = None
+    vfinal: Optional[float] = None
+    note: str = ""
+
+    def to_row(self) -> Dict[str, object]:
+        """Flatten to one table row (first_/last_ prefixes for row values)."""
+        payload = asdict(self)
+        first = payload.pop("first_row")
+        last = payload.pop("last_row")
+        payload.update({f"first_{k}": v for k, v in first.items()})
+        payload.update({f"last_{k}": v for k, v in last.items()})
+        return payload
+
+
+def adc_column_names(
+    hdr_path: str | Path,
+    alias_map: Optional[Dict[str, str]] = None,
+) -> List[str]:
+    """Return ADC column names from an HDR, mapped to canonical where known.
+
+    Unknown tokens keep their raw spelling so nothing is silently dropped.
+    """
+    raw_tokens = parse_adc_tokens(extract_adcfileformat_line(hdr_path))
+    mapped, _ = map_tokens_to_canonical(raw_tokens, alias_map=alias_map)
+    return [m if m is not None else raw for raw, m in zip(raw_tokens, mapped)]
+
+
+def read_first_line(path: str | Path, max_bytes: int = DEFAULT_HEAD_BYTES) -> Optional[str]:
+    """Return the first non-empty line of a file using a bounded prefix read."""
+    with open(path, "rb") as f:
+        chunk = f.read(max_bytes)
+    for raw in chunk.split(b"\n"):
+        line = raw.decode("utf-8", errors="ignore").strip()
+        if line:
+            return line
+    return None
+
+
+def read_last_line(
+    path: str | Path,
+    block_size: int = DEFAULT_TAIL_BLOCK,
+    min_fields: Optional[int] = None,
+) -> Optional[str]:
+    """Return the last complete, non-empty line by seeking from end-of-file.
+
+    Reads backwards in ``block_size`` steps until a full line is available.
+    If ``min_fields`` is given, a trailing line with fewer comma-separated
+    fields (e.g. a row still being written) is skipped in favor of the one
+    before it.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos = end
+        buf = b""
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            lines = buf.split(b"\n")
+            # lines[0] may be partial unless we reached the file start.
+            complete = lines if pos == 0 else lines[1:]
+            for raw in reversed(complete):
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if not line:
+                    continue
+                if min_fields is not None and len(line.split(",")) < min_fields:
+                    continue
+                return line
+    return None
+
+
+def _parse_row(line: Optional[str], columns: Sequence[str]) -> Dict[str, Optional[float]]:
+    """Parse one ADC line into {column: float}; non-numeric values become None."""
+    if line is None:
+        return {}
+    values = [v.strip() for v in line.split(",")]
+    row: Dict[str, Optional[float]] = {}
+    for name, value in zip(columns, values):
+        try:
+            row[name] = float(value)
+        except ValueError:
+            row[name] = None
+    return row
+
+
+def probe_bin(
+    adc_path: str | Path,
+    hdr_path: Optional[str | Path] = None,
+    *,
+    alias_map: Optional[Dict[str, str]] = None,
+    head_bytes: int = DEFAULT_HEAD_BYTES,
+    tail_block: int = DEFAULT_TAIL_BLOCK,
+) -> BinProbe:
+    """Summarize one bin from its first and last ADC rows.
+
+    ``hdr_path`` defaults to the .hdr next to the .adc.
+    """
+    adc_path = Path(adc_path)
+    hdr_path = Path(hdr_path) if hdr_path else adc_path.with_suffix(".hdr")
+
+    probe = BinProbe(
+        pid=adc_path.stem,
+        adc_path=str(adc_path),
+        hdr_path=str(hdr_path) if hdr_path.exists() else None,
+        adc_bytes=adc_path.stat().st_size,
+    )
+
+    try:
+        columns = adc_column_names(hdr_path, alias_map=alias_map)
+    except (OSError, HeaderMappingError) as exc:
+        probe.note = f"header error: {exc}"
+        return probe
+
+    first_line = read_first_line(adc_path, max_bytes=head_bytes)
+    if first_line is None:
+        probe.note = "empty adc"
+        return probe
+
+    n_fields = len(first_line.split(","))
+    last_line = read_last_line(adc_path, block_size=tail_block, min_fields=n_fields)
+
+    probe.first_row = _parse_row(first_line, columns)
+    probe.last_row = _parse_row(last_line, columns)
+
+    last = probe.last_row
+    trig = last.get("trigger#")
+    probe.n_triggers = int(trig) if trig is not None else None
+    probe.runtime_final = last.get("RunTime")
+    probe.inhibittime_final = last.get("InhibitTime")
+    if probe.runtime_final is not None and probe.inhibittime_final is not None:
+        probe.looktime = probe.runtime_final - probe.inhibittime_final
+        probe.vfinal = probe.looktime / SECONDS_PER_ML
+
+    return probe
+
+
+def probe_directory(
+    directory: str | Path,
+    pattern: str = "*.adc",
+    recursive: bool = True,
+    alias_map: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """Probe every .adc under a directory and return one row per bin."""
+    directory = Path(directory)
+    globber = directory.rglob if recursive else directory.glob
+    rows = [
+        probe_bin(adc_path, alias_map=alias_map).to_row()
+        for adc_path in sorted(globber(pattern))
+    ]
+    return pd.DataFrame(rows)
+
+
+def summarize_first_adc_row(data_dir: str | Path) -> pd.DataFrame:
+    """Drop-in replacement for the FirstRoiProblem notebook helper.
+
+    Same output columns, but only the first line of each .adc is read.
+    """
+    data_dir = Path(data_dir)
+    rows = []
+
+    for hdr_path in sorted(data_dir.rglob("*.hdr")):
+        adc_path = hdr_path.with_suffix(".adc")
+        if not adc_path.exists():
+            continue
+
+        row = {
+            "file": hdr_path.stem,
+            "first_RunTime": None,
+            "first_InhibitTime": None,
+            "first_RoiX": None,
+            "first_RoiY": None,
+            "roi_binary": None,
+            "note": "",
+        }
+
+        try:
+            columns = adc_column_names(hdr_path)
+            first = _parse_row(read_first_line(adc_path), columns)
+            if not first:
+                continue
+
+            required = ["RunTime", "InhibitTime", "RoiX", "RoiY"]
+            missing = [c for c in required if c not in first]
+            if missing:
+                row["note"] = f"missing columns: {missing}"
+                rows.append(row)
+                continue
+
+            rx, ry = first["RoiX"], first["RoiY"]
+            row.update({
+                "first_RunTime": first["RunTime"],
+                "first_InhibitTime": first["InhibitTime"],
+                "first_RoiX": rx,
+                "first_RoiY": ry,
+            })
+            # zero ROI defined as RoiX==0 and RoiY==0
+            if rx is not None and ry is not None:
+                row["roi_binary"] = 0 if (rx == 0 and ry == 0) else 1
+
+        except Exception as e:
+            row["note"] = f"error: {e}"
+
+        rows.append(row)
+
+    if not rows:
+        return pd.DataFrame(columns=[
+            "file", "first_RunTime", "first_InhibitTime",
+            "first_RoiX", "first_RoiY", "roi_binary", "note",
+        ])
+    return pd.DataFrame(rows).sort_values("file").reset_index(drop=True)
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(
+        description="Summarize IFCB bins from the first and last .adc rows only"
+    )
+    parser.add_argument("directory", type=str, help="Directory containing .adc/.hdr pairs")
+    parser.add_argument("--pattern", type=str, default="*.adc", help="Glob pattern (default: *.adc)")
+    parser.add_argument("--non-recursive", action="store_true", help="Do not recurse into subdirectories")
+    parser.add_argument("--output", type=str, default=None, help="Optional CSV output path")
+    args = parser.parse_args()
+
+    df = probe_directory(args.directory, pattern=args.pattern, recursive=not args.non_recursive)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {len(df):,} bin probes to {args.output}")
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,354 @@
+"""Watch a deployment folder and summarize growing .adc files as they are written.
+
+During a run the instrument appends rows to the current bin's .adc file. Instead
+of re-reading whole files, this module remembers a byte offset per .adc and
+parses only newly appended, complete lines.
+
+Design goals:
+- One ``AdcTail`` per .adc: read from the stored offset, consume only complete
+  lines, leave a partially written trailing line for the next poll.
+- Running per-bin summaries (looktime, inhibit fraction, zero-ROI and trigger
+  counts) updated in O(new rows).
+- Per-class counts from the bin's class CSV, re-read whenever its size or
+  mtime changes so a CSV caught half-written is picked up again.
+- Bins whose header or class CSV is not readable yet are retried on the next
+  poll; an .adc that shrinks is re-read from the start with fresh totals.
+- Optional dead-time alarm callback when the inhibit fraction exceeds a threshold.
+- Optional online changepoint detector fed each finished bin's inhibit
+  fraction, to flag shifts in dead-time behaviour across a deployment.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+import argparse
+import time
+
+import pandas as pd
+
+from adc_header_standardizer import HeaderMappingError
+from ifcb_bin_probe import SECONDS_PER_ML, adc_column_names
+from ifcb_changepoint import ChangePoint, make_detector
+
+
+DEFAULT_CLASS_SUFFIXES = ("_class_vNone.csv", "_class.csv", "_class_scores.csv")
+
+ROI_GEOMETRY_COLUMNS = ("RoiX", "RoiY", "RoiWidth", "RoiHeight")
+
+
+class AdcTail:
+    """Incremental reader for one growing .adc file."""
+
+    def __init__(self, adc_path: str | Path, columns: Sequence[str]):
+        self.adc_path = Path(adc_path)
+        self.columns = list(columns)
+        self.offset = 0
+        self.restarted = False
+
+    def read_new_rows(self) -> List[Dict[str, Optional[float]]]:
+        """Parse complete lines appended since the last call.
+
+        Bytes after the last newline are left unread so a row that is still
+        being written is picked up whole on the next call. ``restarted`` is set
+        when the file shrank and was re-read from the start, so callers can
+        discard totals built from the old contents.
+        """
+        size = self.adc_path.stat().st_size
+        self.restarted = size < self.offset
+        if self.restarted:
+            # File was truncated/replaced; start over.
+            self.offset = 0
+        if size == self.offset:
+            return []
+
+        with open(self.adc_path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        last_nl = chunk.rfind(b"\n")
+        if last_nl < 0:
+            return []
+        self.offset += last_nl + 1
+
+        rows = []
+        for raw in chunk[: last_nl + 1].split(b"\n"):
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if not line:
+                continue
+            row: Dict[str, Optional[float]] = {}
+            for name, value in zip(self.columns, line.split(",")):
+                try:
+                    row[name] = float(value)
+                except ValueError:
+                    row[name] = None
+            rows.append(row)
+        return rows
+
+
+@dataclass
+class RunningBinSummary:
+    """Summary of one bin, updated as rows arrive."""
+
+    pid: str
+    n_rows: int = 0
+    n_zero_roi: int = 0
+    n_triggers: Optional[int] = None
+    runtime_final: Optional[float] = None
+    inhibittime_final: Optional[float] = None
+    looktime: Optional[float] = None
+    vfinal: Optional[float] = None
+    inhibit_fraction: Optional[float] = None
+    class_file: Optional[str] = None
+    class_counts: Dict[str, int] = field(default_factory=dict)
+    alarm: bool = False
+
+    def update(self, rows: Sequence[Dict[str, Optional[float]]]) -> None:
+        """Fold newly parsed ADC rows into the running totals."""
+        for row in rows:
+            self.n_rows += 1
+            if all(row.get(c) == 0 for c in ROI_GEOMETRY_COLUMNS):
+                self.n_zero_roi += 1
+            trig = row.get("trigger#")
+            if trig is not None:
+                self.n_triggers = int(trig)
+            if row.get("RunTime") is not None:
+                self.runtime_final = row["RunTime"]
+            if row.get("InhibitTime") is not None:
+                self.inhibittime_final = row["InhibitTime"]
+
+        if self.runtime_final is not None and self.inhibittime_final is not None:
+            self.looktime = self.runtime_final - self.inhibittime_final
+            self.vfinal = self.looktime / SECONDS_PER_ML
+            if self.runtime_final > 0:
+                self.inhibit_fraction = self.inhibittime_final / self.runtime_final
+
+    def to_row(self) -> Dict[str, object]:
+        payload = asdict(self)
+        counts = payload.pop("class_counts")
+        payload.update({f"n_{k}": v for k, v in counts.items()})
+        return payload
+
+
+def class_counts_from_csv(class_csv_path: str | Path, min_score: float = 0.0) -> Dict[str, int]:
+    """Count ROIs per best-scoring class in a class CSV.
+
+    ROIs whose best score is below ``min_score`` are counted as "unclassified".
+    """
+    class_df = pd.read_csv(class_csv_path)
+    score_cols = [
+        c for c in class_df.columns
+        if c not in ("pid", "RoiNumber") and pd.api.types.is_numeric_dtype(class_df[c])
+    ]
+    if not score_cols or class_df.empty:
+        return {}
+    scores = class_df[score_cols]
+    best = scores.idxmax(axis=1)
+    best = best.where(scores.max(axis=1) >= min_score, "unclassified")
+    return {str(k): int(v) for k, v in best.value_counts().items()}
+
+
+class WatchFolder:
+    """Poll a directory and keep running summaries for every bin in it.
+
+    Parameters
+    ----------
+    directory:
+        Folder the instrument (or a sync job) writes .hdr/.adc/class files into.
+    dead_time_threshold:
+        Inhibit fraction (InhibitTime / RunTime) above which ``on_alarm`` fires.
+        The alarm fires once per bin.
+    min_rows_for_alarm:
+        Ignore the first few rows, where the fraction is noisy.
+    on_alarm:
+        Callback receiving the ``RunningBinSummary`` that crossed the threshold.
+    changepoint:
+        Online detector (``CusumDetector``/``BocpdDetector``, or a method name
+        for ``make_detector``) fed the inhibit fraction of each finished bin.
+        A bin counts as finished once a later bin (by pid) has appeared.
+    on_changepoint:
+        Callback receiving ``(pid, ChangePoint)`` where ``pid`` is the first
+        bin of the new regime.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        recursive: bool = False,
+        class_suffixes: Sequence[str] = DEFAULT_CLASS_SUFFIXES,
+        min_class_score: float = 0.0,
+        dead_time_threshold: Optional[float] = None,
+        min_rows_for_alarm: int = 20,
+        on_alarm: Optional[Callable[[RunningBinSummary], None]] = None,
+        changepoint=None,
+        on_changepoint: Optional[Callable[[str, ChangePoint], None]] = None,
+    ):
+        self.directory = Path(directory)
+        self.recursive = recursive
+        self.class_suffixes = tuple(class_suffixes)
+        self.min_class_score = min_class_score
+        self.dead_time_threshold = dead_time_threshold
+        self.min_rows_for_alarm = min_rows_for_alarm
+        self.on_alarm = on_alarm
+        self.tails: Dict[str, AdcTail] = {}
+        self.summaries: Dict[str, RunningBinSummary] = {}
+        self.changepoint = make_detector(changepoint) if isinstance(changepoint, str) else changepoint
+        self.on_changepoint = on_changepoint
+        self.changepoints: List[Dict[str, object]] = []
+        self._finished: Set[str] = set()
+        self._fed_pids: List[str] = []
+        self._class_stamps: Dict[str, Tuple[str, int, int]] = {}
+
+    def _find_class_csv(self, adc_path: Path) -> Optional[Path]:
+        for suffix in self.class_suffixes:
+            candidate = adc_path.with_name(adc_path.stem + suffix)
+            if candidate.exists():
+                return candidate
+        return None
+
+    def _refresh_class_counts(self, pid: str, adc_path: Path, summary: RunningBinSummary) -> bool:
+        """Re-read the class CSV if it is new or changed; True if counts were updated."""
+        class_path = self._find_class_csv(adc_path)
+        if class_path is None:
+            return False
+        try:
+            st = class_path.stat()
+        except OSError:
+            return False
+        stamp = (str(class_path), st.st_size, st.st_mtime_ns)
+        if self._class_stamps.get(pid) == stamp:
+            return False
+        try:
+            counts = class_counts_from_csv(class_path, self.min_class_score)
+        except (OSError, pd.errors.EmptyDataError, pd.errors.ParserError):
+            return False  # still being written; try again next poll
+        self._class_stamps[pid] = stamp
+        summary.class_counts = counts
+        summary.class_file = str(class_path)
+        return True
+
+    def poll(self) -> List[RunningBinSummary]:
+        """Read new data once; return the summaries that changed."""
+        globber = self.directory.rglob if self.recursive else self.directory.glob
+        changed: List[RunningBinSummary] = []
+
+        for adc_path in sorted(globber("*.adc")):
+            pid = adc_path.stem
+            if pid not in self.tails:
+                hdr_path = adc_path.with_suffix(".hdr")
+                if not hdr_path.exists():
+                    continue  # header not written yet; try again next poll
+                try:
+                    columns = adc_column_names(hdr_path)
+                except (OSError, HeaderMappingError):
+                    continue  # header still being written; try again next poll
+                self.tails[pid] = AdcTail(adc_path, columns)
+                self.summaries[pid] = RunningBinSummary(pid=pid)
+
+            tail = self.tails[pid]
+            rows = tail.read_new_rows()
+            if tail.restarted:
+                self.summaries[pid] = RunningBinSummary(pid=pid)
+                self._class_stamps.pop(pid, None)
+            summary = self.summaries[pid]
+            dirty = bool(rows) or tail.restarted
+            if rows:
+                summary.update(rows)
+
+            if self._refresh_class_counts(pid, adc_path, summary):
+                dirty = True
+
+            if (
+                self.dead_time_threshold is not None
+                and not summary.alarm
+                and summary.n_rows >= self.min_rows_for_alarm
+                and summary.inhibit_fraction is not None
+                and summary.inhibit_fraction > self.dead_time_threshold
+            ):
+                summary.alarm = True
+                if self.on_alarm is not None:
+                    self.on_alarm(summary)
+
+            if dirty:
+                changed.append(summary)
+
+        if self.changepoint is not None:
+            self._feed_finished_bins()
+        return changed
+
+    def _feed_finished_bins(self) -> None:
+        """Pass every newly finished bin's inhibit fraction to the detector, in pid order."""
+        for pid in sorted(self.summaries)[:-1]:
+            if pid in self._finished:
+                continue
+            self._finished.add(pid)
+            fraction = self.summaries[pid].inhibit_fraction
+            if fraction is None:
+                continue
+            self._fed_pids.append(pid)
+            cp = self.changepoint.update(fraction)
+            if cp is None:
+                continue
+            start_pid = self._fed_pids[cp.index]
+            self.changepoints.append({"pid": start_pid, "detected_pid": pid, **cp.to_row()})
+            if self.on_changepoint is not None:
+                self.on_changepoint(start_pid, cp)
+
+    def summary_frame(self) -> pd.DataFrame:
+        """Current summaries as one row per bin."""
+        return pd.DataFrame([s.to_row() for s in self.summaries.values()])
+
+    def watch(
+        self,
+        interval_s: float = 60.0,
+        max_polls: Optional[int] = None,
+        on_update: Optional[Callable[[List[RunningBinSummary]], None]] = None,
+    ) -> None:
+        """Poll every ``interval_s`` seconds until ``max_polls`` (or forever)."""
+        n = 0
+        while max_polls is None or n < max_polls:
+            changed = self.poll()
+            if changed and on_update is not None:
+                on_update(changed)
+            n += 1
+            if max_polls is None or n < max_polls:
+                time.sleep(interval_s)
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Live summaries for a folder of growing IFCB .adc files")
+    parser.add_argument("directory", type=str, help="Folder to watch")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between polls (default: 60)")
+    parser.add_argument("--dead-time-threshold", type=float, default=None, help="Alarm when InhibitTime/RunTime exceeds this")
+    parser.add_argument("--recursive", action="store_true", help="Also watch subdirectories")
+    parser.add_argument("--changepoint", choices=["cusum", "bocpd"], default=None,
+                        help="Flag shifts in per-bin inhibit fraction with an online detector")
+    args = parser.parse_args()
+
+    def _alarm(summary: RunningBinSummary) -> None:
+        print(f"[ALARM] {summary.pid}: inhibit fraction {summary.inhibit_fraction:.3f}")
+
+    def _changepoint(pid: str, cp: ChangePoint) -> None:
+        before = f"{cp.mean_before:.3f}" if cp.mean_before is not None else "n/a"
+        print(f"[CHANGE] regime starting at {pid}: inhibit fraction {before} -> {cp.mean_after:.3f}")
+
+    def _report(changed: List[RunningBinSummary]) -> None:
+        for s in changed:
+            frac = f"{s.inhibit_fraction:.3f}" if s.inhibit_fraction is not None else "n/a"
+            print(f"{s.pid}: rows={s.n_rows} looktime={s.looktime} inhibit_fraction={frac}")
+
+    watcher = WatchFolder(
+        args.directory,
+        recursive=args.recursive,
+        dead_time_threshold=args.dead_time_threshold,
+        on_alarm=_alarm,
+        changepoint=args.changepoint,
+        on_changepoint=_changepoint,
+    )
+    watcher.watch(interval_s=args.interval, on_update=_report)
+
+
+if __name__ == "__main__":
+    _cli()
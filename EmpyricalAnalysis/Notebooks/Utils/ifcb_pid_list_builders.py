@@ -0,0 +1,258 @@
+"""PID list builders that pick one bin per daily target time.
+
+``get_ifcb_pids_by_daily_times`` from PIDListBuilder, rebuilt on sorted
+``numpy.searchsorted`` lookups so multi-year, multi-dataset schedules stay fast.
+
+Design goals:
+- Build the day x time target grid with array broadcasting, not Python loops.
+- Match every target to a bin with one ``searchsorted`` per dataset.
+- Support forward (first bin at/after target, the original behavior),
+  backward and nearest matching with an optional tolerance window.
+- Return the match distance for every target so near-misses can be audited.
+- Read bins from the dashboard or, offline, from a local ``BinCatalog``.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Tuple
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from ifcb_bin_catalog import BinCatalog, fetch_export_metadata
+
+
+DIRECTIONS = ("forward", "backward", "nearest")
+
+PICKED_COLUMNS = ["dataset", "target_time", "sample_time", "pid", "delta", "distance_s"]
+
+
+def _parse_daily_times(times: Iterable[str]) -> np.ndarray:
+    """Convert "HH:MM[:SS]" strings to timedelta64[ns] offsets from midnight."""
+    offsets = []
+    for t in times:
+        parts = t.split(":")
+        if len(parts) == 2:
+            hh, mm = parts
+            ss = "0"
+        elif len(parts) == 3:
+            hh, mm, ss = parts
+        else:
+            raise ValueError(f"Time '{t}' must be 'HH:MM' or 'HH:MM:SS'")
+        offsets.append(pd.to_timedelta(f"{int(hh):02d}:{int(mm):02d}:{int(ss):02d}"))
+    return np.array(offsets, dtype="timedelta64[ns]")
+
+
+def daily_target_times(start: str, end: str, times: Iterable[str]) -> pd.DatetimeIndex:
+    """Every day in [start, end] x every time in ``times``, clipped to the window."""
+    start_dt = pd.to_datetime(start, utc=True)
+    end_dt = pd.to_datetime(end, utc=True)
+    days = pd.date_range(start=start_dt.normalize(), end=end_dt.normalize(), freq="D")
+
+    grid = days.tz_localize(None).values[:, None] + _parse_daily_times(times)[None, :]
+    targets = pd.DatetimeIndex(np.sort(grid.ravel())).tz_localize("UTC")
+    return targets[(targets >= start_dt) & (targets <= end_dt)]
+
+
+def _match_sorted(
+    bin_ns: np.ndarray,
+    target_ns: np.ndarray,
+    direction: str,
+) -> np.ndarray:
+    """Index into ``bin_ns`` (sorted) of the match for each target, -1 if none."""
+    n = len(bin_ns)
+    if n == 0:
+        return np.full(len(target_ns), -1, dtype=np.int64)
+
+    right = np.searchsorted(bin_ns, target_ns, side="left")   # first bin >= target
+    if direction == "forward":
+        return np.where(right < n, right, -1)
+
+    left = np.searchsorted(bin_ns, target_ns, side="right") - 1  # last bin <= target
+    if direction == "backward":
+        return left
+
+    # nearest: compare both neighbours; ties go to the later bin
+    r = np.clip(right, 0, n - 1)
+    l = np.clip(left, 0, n - 1)
+    d_right = np.where(right < n, bin_ns[r] - target_ns, np.iinfo(np.int64).max)
+    d_left = np.where(left >= 0, target_ns - bin_ns[l], np.iinfo(np.int64).max)
+    return np.where(d_right <= d_left, r, l)
+
+
+def match_bins_to_targets(
+    bins_df: pd.DataFrame,
+    targets: pd.DatetimeIndex,
+    *,
+    direction: str = "forward",
+    tolerance: Optional[str | pd.Timedelta] = None,
+    same_day_only: bool = True,
+) -> pd.DataFrame:
+    """Match each target time to one bin per dataset.
+
+    ``bins_df`` needs ``pid`` and ``sample_time`` columns; an optional
+    ``dataset`` column matches each dataset independently.
+
+    Returns one row per (dataset, target) with the matched ``sample_time``,
+    ``pid``, signed ``delta`` (sample_time - target_time), absolute
+    ``distance_s`` and ``accepted``. Unmatched targets and targets outside
+    ``tolerance`` or the target's day are kept with ``accepted=False`` so
+    near-misses can be inspected.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+
+    work = bins_df[["pid", "sample_time"]].copy()
+    work["dataset"] = bins_df["dataset"].values if "dataset" in bins_df.columns else ""
+    work["sample_time"] = pd.to_datetime(work["sample_time"], utc=True, errors="coerce")
+    work = work.dropna(subset=["sample_time"])
+
+    target_ns = targets.values.astype("datetime64[ns]").astype(np.int64)
+    tol_ns = pd.Timedelta(tolerance).value if tolerance is not None else None
+
+    pieces = []
+    for dataset, group in work.groupby("dataset", sort=True):
+        group = group.sort_values("sample_time", kind="stable")
+        bin_ns = group["sample_time"].values.astype("datetime64[ns]").astype(np.int64)
+        idx = _match_sorted(bin_ns, target_ns, direction)
+        found = idx >= 0
+        safe = np.where(found, idx, 0)
+
+        matched_ns = np.where(found, bin_ns[safe], 0)
+        delta_ns = matched_ns - target_ns
+        accepted = found.copy()
+        if tol_ns is not None:
+            accepted &= np.abs(delta_ns) <= tol_ns
+        if same_day_only:
+            day_ns = 86_400 * 10**9
+            accepted &= (matched_ns // day_ns) == (target_ns // day_ns)
+
+        pids = group["pid"].to_numpy(dtype=object)[safe]
+        pieces.append(pd.DataFrame({
+            "dataset": dataset,
+            "target_time": targets,
+            "sample_time": pd.to_datetime(np.where(found, matched_ns, np.iinfo(np.int64).min), utc=True),
+            "pid": np.where(found, pids, None),
+            "delta": pd.to_timedelta(np.where(found, delta_ns, np.iinfo(np.int64).min)),
+            "distance_s": np.where(found, np.abs(delta_ns) / 1e9, np.nan),
+            "accepted": accepted,
+        }))
+
+    if not pieces:
+        return pd.DataFrame(columns=PICKED_COLUMNS + ["accepted"])
+    return pd.concat(pieces, ignore_index=True)
+
+
+def _load_bins(
+    base_url: str,
+    datasets: List[str],
+    start: str,
+    end: str,
+    include_skip: bool,
+    timeout: int,
+    catalog: Optional[BinCatalog],
+) -> pd.DataFrame:
+    if catalog is not None:
+        return catalog.query_bins(datasets=datasets, start=start, end=end, include_skip=include_skip)
+
+    frames = []
+    for dataset in datasets:
+        df = fetch_export_metadata(base_url, dataset, start, end, include_skip=include_skip, timeout=timeout)
+        df["dataset"] = dataset
+        frames.append(df)
+    bins = pd.concat(frames, ignore_index=True)
+    bins["sample_time"] = pd.to_datetime(bins["sample_time"], utc=True, errors="coerce")
+    start_dt = pd.to_datetime(start, utc=True)
+    end_dt = pd.to_datetime(end, utc=True)
+    return bins[(bins["sample_time"] >= start_dt) & (bins["sample_time"] <= end_dt)]
+
+
+def get_ifcb_pids_by_daily_times(
+    base_url: str,
+    dataset: str | Iterable[str],
+    start: str,
+    end: str,
+    times: List[str],
+    *,
+    same_day_only: bool = True,
+    include_skip: bool = True,
+    timeout: int = 60,
+    direction: str = "forward",
+    tolerance: Optional[str | pd.Timedelta] = None,
+    catalog: Optional[BinCatalog] = None,
+) -> Tuple[List[str], pd.DataFrame]:
+    """
+    For each day in [start, end], and for each time in `times` (HH:MM or HH:MM:SS),
+    pick one bin per dataset.
+
+    With the default direction="forward" this is the first bin with
+    sample_time >= target time, as in the PIDListBuilder notebook. Use
+    direction="nearest" plus a tolerance (e.g. "30min") for symmetric windows.
+    If same_day_only=True, matches that fall on another day are dropped.
+
+    Pass a BinCatalog to build the list offline from the local catalog.
+
+    Returns
+    -------
+    pids: list of selected pid strings (unique per dataset, in chronological order)
+    picked_df: dataframe with dataset, target_time, sample_time, pid, delta, distance_s
+    """
+    datasets = [dataset] if isinstance(dataset, str) else list(dataset)
+    bins = _load_bins(base_url, datasets, start, end, include_skip, timeout, catalog)
+
+    targets = daily_target_times(start, end, times)
+    if bins.empty or len(targets) == 0:
+        return [], pd.DataFrame(columns=PICKED_COLUMNS)
+
+    matches = match_bins_to_targets(
+        bins, targets, direction=direction, tolerance=tolerance, same_day_only=same_day_only
+    )
+    picked = matches[matches["accepted"]].sort_values(["target_time", "dataset"], kind="stable")
+
+    # De-duplicate if two targets land on the same PID (happens if bins are sparse)
+    picked = picked.drop_duplicates(subset=["dataset", "pid"], keep="first")
+
+    pids = picked["pid"].tolist()
+    return pids, picked[PICKED_COLUMNS].reset_index(drop=True)
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Build a PID list of one bin per daily target time")
+    parser.add_argument("--base-url", type=str, default="https://habon-ifcb.whoi.edu")
+    parser.add_argument("--dataset", type=str, action="append", required=True)
+    parser.add_argument("--start", type=str, required=True)
+    parser.add_argument("--end", type=str, required=True)
+    parser.add_argument("--times", type=str, nargs="+", required=True, help="e.g. 00:00 06:00 12:00 18:00")
+    parser.add_argument("--direction", type=str, default="forward", choices=DIRECTIONS)
+    parser.add_argument("--tolerance", type=str, default=None, help='e.g. "30min"')
+    parser.add_argument("--allow-other-day", action="store_true", help="Keep matches on another day")
+    parser.add_argument("--catalog", type=str, default=None, help="Query a local BinCatalog instead of the dashboard")
+    parser.add_argument("--output", type=str, required=True, help="JSON output path for the PID list")
+    args = parser.parse_args()
+
+    catalog = BinCatalog(args.catalog) if args.catalog else None
+    try:
+        pids, _ = get_ifcb_pids_by_daily_times(
+            base_url=args.base_url,
+            dataset=args.dataset,
+            start=args.start,
+            end=args.end,
+            times=args.times,
+            same_day_only=not args.allow_other_day,
+            direction=args.direction,
+            tolerance=args.tolerance,
+            catalog=catalog,
+        )
+    finally:
+        if catalog is not None:
+            catalog.close()
+
+    with open(args.output, "w") as f:
+        json.dump(pids, f)
+    print(f"Wrote {len(pids):,} PIDs to {args.output}")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,229 @@
+"""Zero-copy access to IFCB ``.roi`` images through the ADC byte offsets.
+
+Each non-zero ROI is stored in the bin's ``.roi`` file as ``RoiWidth *
+RoiHeight`` raw 8-bit pixels starting at ``StartByte``. RoiNumber is the
+1-based ADC line number, the same convention the plotters use to join class
+CSVs to ADC rows.
+
+Design goals:
+- Memory-map the ``.roi`` file once per bin; single images are NumPy views
+  into the map, so nothing is copied until the caller asks for it.
+- Read only the three offset columns from the ADC, resolving column names
+  through the header alias map so legacy ADCFileFormat variants work.
+- Batch requests by bin: ``read_roi_images`` takes ROI pids from any number
+  of bins and opens each ``.roi`` file exactly once.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+from ifcb_bin_probe import adc_column_names
+
+
+OFFSET_COLUMNS = ("RoiWidth", "RoiHeight", "StartByte")
+
+_ROI_PID = re.compile(r"^(?P<bin>.+)_(?P<roi>\d+)$")
+
+
+def parse_roi_pid(roi_pid: str) -> Tuple[str, int]:
+    """Split ``<bin pid>_<RoiNumber>`` (e.g. ``..._IFCB999_00012``) into its parts."""
+    m = _ROI_PID.match(roi_pid.strip())
+    if not m:
+        raise ValueError(f"not a ROI pid: {roi_pid!r}")
+    return m.group("bin"), int(m.group("roi"))
+
+
+@dataclass(frozen=True)
+class RoiIndex:
+    """Per-ROI offsets for one bin, aligned by RoiNumber (1-based ADC line)."""
+
+    width: np.ndarray
+    height: np.ndarray
+    start_byte: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.width)
+
+    @property
+    def nbytes(self) -> np.ndarray:
+        return self.width * self.height
+
+    @property
+    def roi_numbers(self) -> np.ndarray:
+        """RoiNumbers that have an image (non-zero width and height)."""
+        return np.flatnonzero(self.nbytes > 0) + 1
+
+    @classmethod
+    def from_adc(
+        cls,
+        adc_path: str | Path,
+        hdr_path: Optional[str | Path] = None,
+        alias_map: Optional[Dict[str, str]] = None,
+    ) -> "RoiIndex":
+        """Read RoiWidth/RoiHeight/StartByte from an ``.adc`` (HDR defaults alongside)."""
+        adc_path = Path(adc_path)
+        hdr_path = Path(hdr_path) if hdr_path else adc_path.with_suffix(".hdr")
+        columns = adc_column_names(hdr_path, alias_map=alias_map)
+        missing = [c for c in OFFSET_COLUMNS if c not in columns]
+        if missing:
+            raise ValueError(f"{hdr_path.name}: ADCFileFormat has no {missing}")
+
+        usecols = [columns.index(c) for c in OFFSET_COLUMNS]
+        if adc_path.stat().st_size == 0:
+            return cls(*(np.zeros(0, dtype=np.int64) for _ in OFFSET_COLUMNS))
+        df = pd.read_csv(adc_path, header=None, usecols=usecols, skipinitialspace=True)
+        df.columns = [columns[i] for i in usecols]
+        values = {c: df[c].fillna(0).to_numpy(dtype=np.int64) for c in OFFSET_COLUMNS}
+        return cls(values["RoiWidth"], values["RoiHeight"], values["StartByte"])
+
+
+class RoiReader:
+    """Memory-mapped reader for one bin's ``.roi`` file.
+
+    Images have shape ``(RoiHeight, RoiWidth)`` and dtype uint8. Use as a
+    context manager, or call ``close()`` to release the map.
+    """
+
+    def __init__(self, roi_path: str | Path, index: Optional[RoiIndex] = None):
+        self.roi_path = Path(roi_path)
+        self.index = index if index is not None else RoiIndex.from_adc(self.roi_path.with_suffix(".adc"))
+        size = self.roi_path.stat().st_size
+        self._buf: Optional[np.ndarray] = (
+            np.memmap(self.roi_path, dtype=np.uint8, mode="r") if size else np.zeros(0, dtype=np.uint8)
+        )
+
+        end = self.index.start_byte + self.index.nbytes
+        has_image = self.index.nbytes > 0
+        if has_image.any() and int(end[has_image].max()) > size:
+            bad = int(np.flatnonzero(has_image & (end > size))[0]) + 1
+            raise ValueError(f"{self.roi_path.name}: ROI {bad} extends past end of file ({size} bytes)")
+
+    def close(self) -> None:
+        # Dropping the last reference to the memmap unmaps the file
+        self._buf = None
+
+    def __enter__(self) -> "RoiReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _check(self, roi_number: int) -> int:
+        if self._buf is None:
+            raise ValueError("reader is closed")
+        i = int(roi_number) - 1
+        if not 0 <= i < len(self.index):
+            raise IndexError(f"RoiNumber {roi_number} out of range 1..{len(self.index)}")
+        return i
+
+    def image(self, roi_number: int) -> np.ndarray:
+        """View of one ROI; a (0, 0) array for zero ROIs (no image stored)."""
+        i = self._check(roi_number)
+        h, w = int(self.index.height[i]), int(self.index.width[i])
+        if h * w == 0:
+            return np.zeros((0, 0), dtype=np.uint8)
+        start = int(self.index.start_byte[i])
+        return self._buf[start:start + h * w].reshape(h, w)
+
+    def images(self, roi_numbers: Optional[Iterable[int]] = None) -> List[np.ndarray]:
+        """Views for ``roi_numbers`` (default: every ROI that has an image)."""
+        numbers = self.index.roi_numbers if roi_numbers is None else roi_numbers
+        return [self.image(n) for n in numbers]
+
+    def iter_images(self, roi_numbers: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        numbers = self.index.roi_numbers if roi_numbers is None else roi_numbers
+        for n in numbers:
+            yield int(n), self.image(n)
+
+    def stack(
+        self,
+        roi_numbers: Optional[Sequence[int]] = None,
+        fill: int = 0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Copy ROIs into one ``(n, max_h, max_w)`` array for batch processing.
+
+        Returns ``(stack, shapes)`` where ``shapes[k] = (height, width)``; pixels
+        outside each ROI are set to ``fill``.
+        """
+        numbers = np.asarray(self.index.roi_numbers if roi_numbers is None else roi_numbers, dtype=np.int64)
+        for n in numbers:
+            self._check(n)
+        h = self.index.height[numbers - 1]
+        w = self.index.width[numbers - 1]
+        shapes = np.stack([h, w], axis=1)
+        out = np.full((len(numbers), int(h.max(initial=0)), int(w.max(initial=0))), fill, dtype=np.uint8)
+        for k, n in enumerate(numbers):
+            if h[k] and w[k]:
+                out[k, :h[k], :w[k]] = self.image(n)
+        return out, shapes
+
+
+def find_bin_file(data_dir: str | Path, pid: str, suffix: str) -> Optional[Path]:
+    """``<data_dir>/<pid><suffix>``, falling back to a recursive search."""
+    data_dir = Path(data_dir)
+    direct = data_dir / f"{pid}{suffix}"
+    if direct.exists():
+        return direct
+    return next(iter(sorted(data_dir.rglob(f"{pid}{suffix}"))), None)
+
+
+def read_roi_images(
+    roi_pids: Iterable[str],
+    data_dir: str | Path,
+    copy: bool = True,
+    alias_map: Optional[Dict[str, str]] = None,
+) -> Dict[str, np.ndarray]:
+    """Images for ROI pids from many bins, opening each bin once.
+
+    With ``copy=False`` the arrays are views into the memory maps and stay
+    valid for as long as they are referenced. Missing bins raise
+    FileNotFoundError.
+    """
+    by_bin: Dict[str, List[Tuple[str, int]]] = {}
+    for roi_pid in roi_pids:
+        bin_pid, roi_number = parse_roi_pid(roi_pid)
+        by_bin.setdefault(bin_pid, []).append((roi_pid, roi_number))
+
+    out: Dict[str, np.ndarray] = {}
+    for bin_pid, wanted in by_bin.items():
+        roi_path = find_bin_file(data_dir, bin_pid, ".roi")
+        if roi_path is None:
+            raise FileNotFoundError(f"no .roi file for {bin_pid} under {data_dir}")
+        index = RoiIndex.from_adc(roi_path.with_suffix(".adc"), alias_map=alias_map)
+        reader = RoiReader(roi_path, index)
+        for roi_pid, roi_number in wanted:
+            img = reader.image(roi_number)
+            out[roi_pid] = img.copy() if copy else img
+        if copy:
+            reader.close()
+    return out
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Export IFCB ROI images as .npy files")
+    parser.add_argument("data_dir", type=str, help="Directory containing .roi/.adc/.hdr files")
+    parser.add_argument("roi_pids", nargs="+", help="ROI pids, e.g. D20240101T000000_IFCB999_00012")
+    parser.add_argument("--out-dir", type=str, default=".", help="Where to write <roi pid>.npy")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    images = read_roi_images(args.roi_pids, args.data_dir)
+    for roi_pid, img in images.items():
+        np.save(out_dir / f"{roi_pid}.npy", img)
+        print(f"{roi_pid}: {img.shape[0]}x{img.shape[1]}")
+
+
+if __name__ == "__main__":
+    _cli()
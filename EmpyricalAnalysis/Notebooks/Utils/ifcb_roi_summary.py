@@ -0,0 +1,120 @@
+"""Single-pass ROI-type summaries over a directory of ingested IFCB CSVs.
+
+Replaces the two-pass ``summarize_ifcb_directory`` from ROISummaryScraper.
+
+Design goals:
+- Read each file once, projecting to ``RoiType`` and the summary columns.
+- Keep only a small sparse ``{RoiType: count}`` dict per file, never the frame.
+- Widen to ``roi0..roiN`` (N = largest RoiType seen anywhere) at the end.
+- Read files concurrently; the C CSV parser releases the GIL for most of the work.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import argparse
+
+import pandas as pd
+
+from ifcb_stage_timing import stage
+
+
+SUMMARY_COLUMNS = ("RoiType", "VolumeAnalyzed", "InhibitTime", "RunTime")
+
+
+def _summarize_one_csv(path: Path) -> Optional[Dict[str, object]]:
+    """Return a sparse summary for one CSV, or None if it has no RoiType."""
+    with stage("summary_read_csv", bin=path.stem, path=path) as st:
+        df = pd.read_csv(path, usecols=lambda c: c in SUMMARY_COLUMNS)
+        st.add(rows=len(df))
+    if "RoiType" not in df.columns:
+        return None
+
+    def _col_max(name: str) -> float:
+        if name not in df.columns:
+            return float("nan")
+        return pd.to_numeric(df[name], errors="coerce").max()
+
+    vfinal = _col_max("VolumeAnalyzed")
+    inhibfinal = _col_max("InhibitTime")
+    runtime_final = _col_max("RunTime")
+
+    counts = df["RoiType"].value_counts()
+    return {
+        "filename": path.name,
+        "vfinal": vfinal,
+        "inhibittime_final": inhibfinal,
+        "looktime": runtime_final - inhibfinal,
+        "roi_counts": {int(k): int(v) for k, v in counts.items()},
+    }
+
+
+def iter_roi_summaries(
+    directory: str | Path,
+    pattern: str = "*.csv",
+    max_workers: Optional[int] = None,
+) -> Iterator[Dict[str, object]]:
+    """Yield sparse per-file summaries in filename order.
+
+    Files without a ``RoiType`` column are skipped, as before.
+    """
+    files = sorted(Path(directory).glob(pattern))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for summary in pool.map(_summarize_one_csv, files):
+            if summary is not None:
+                yield summary
+
+
+def summarize_ifcb_directory(
+    directory: str | Path,
+    pattern: str = "*.csv",
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """One row per file: filename, vfinal, inhibittime_final, looktime, roi0..roiN.
+
+    Output matches the ROISummaryScraper notebook version; roi columns run from
+    0 to the largest RoiType found in any file and are zero-filled.
+    """
+    rows: List[Dict[str, object]] = []
+    global_max_roi = 0
+
+    for summary in iter_roi_summaries(directory, pattern=pattern, max_workers=max_workers):
+        roi_counts = summary.pop("roi_counts")
+        if roi_counts:
+            global_max_roi = max(global_max_roi, max(roi_counts))
+        summary.update({f"roi{k}": v for k, v in roi_counts.items()})
+        rows.append(summary)
+
+    base_cols = ["filename", "vfinal", "inhibittime_final", "looktime"]
+    roi_cols = [f"roi{i}" for i in range(global_max_roi + 1)]
+    if not rows:
+        return pd.DataFrame(columns=base_cols)
+
+    out = pd.DataFrame(rows)
+    out = out.reindex(columns=base_cols + roi_cols)
+    out[roi_cols] = out[roi_cols].fillna(0).astype(int)
+    return out
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(
+        description="Summarize RoiType counts and look time for a directory of ingested IFCB CSVs"
+    )
+    parser.add_argument("directory", type=str, help="Directory of *_adc_only.csv / *_merged.csv files")
+    parser.add_argument("--pattern", type=str, default="*.csv", help="Glob pattern (default: *.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of reader threads")
+    parser.add_argument("--output", type=str, default=None, help="Optional CSV output path")
+    args = parser.parse_args()
+
+    df = summarize_ifcb_directory(args.directory, pattern=args.pattern, max_workers=args.workers)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {len(df):,} file summaries to {args.output}")
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,362 @@
+"""Opt-in per-stage timing for the ingest, header, summary and feature pipelines.
+
+Pipelines wrap their stages (download, header parse, ``pd.read_csv``, class
+merge, summarize, ...) in ``stage(...)`` blocks. Nothing is recorded unless a
+run is being recorded:
+
+    from ifcb_stage_timing import recording
+
+    with recording() as rec:
+        process_hdr_directory(data_dir)
+    print(rec.aggregate())
+    rec.to_csv("stage_times.csv")
+
+Design goals:
+- Disabled by default; ``stage()`` then returns a shared no-op context, so the
+  cost is one global check per stage.
+- One record per stage per bin: wall time, bytes read, rows parsed, the
+  peak resident memory reached during the stage above its entry RSS, and
+  the process-lifetime peak RSS when the stage ended. Only the former is
+  per bin; the process peak only ever grows.
+- On Linux the per-stage peak comes from resetting the kernel's RSS
+  high-water mark (``/proc/self/clear_refs``) at stage entry and reading
+  ``VmHWM`` at exit; nested and concurrent stages fold the mark in before
+  each reset. The reset also lowers ``ru_maxrss``, so the process peak is
+  tracked here instead. Elsewhere the per-stage figure falls back to RSS at
+  exit minus RSS at entry, which misses memory freed inside the stage.
+- Records go to the active ``StageRecorder`` and to any callbacks
+  (``callback(record_dict)``) so they can be forwarded to other metrics
+  systems.
+- Recording is per process: stages that run inside pool workers are not
+  collected by the parent's recorder.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+MetricsCallback = Callable[[Dict[str, object]], None]
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # Windows
+    _PAGE_SIZE = 4096
+
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident set size in MB from /proc (None where unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * _PAGE_SIZE / (1024 * 1024)
+
+
+def high_water_rss_mb() -> Optional[float]:
+    """Kernel RSS high-water mark (``VmHWM``) in MB (None where unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def reset_high_water() -> bool:
+    """Reset ``VmHWM`` to the current RSS; False where not supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+# Highest VmHWM seen before any reset, since resets also lower ru_maxrss
+_process_peak_mb = 0.0
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process peak resident set size in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return max(rss_mb, _process_peak_mb)
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    bin: Optional[str]
+    wall_s: float
+    bytes_read: Optional[int] = None
+    rows: Optional[int] = None
+    peak_rss_delta_mb: Optional[float] = None
+    process_peak_rss_mb: Optional[float] = None
+    started_at: float = 0.0
+    error: Optional[str] = None
+
+    def to_row(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class StageRecorder:
+    """Collects ``StageRecord``s for one run (thread-safe)."""
+
+    def __init__(self):
+        self.records: List[StageRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: StageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([r.to_row() for r in self.records],
+                            columns=list(StageRecord.__dataclass_fields__))
+
+    def aggregate(self) -> pd.DataFrame:
+        """Per-stage totals: calls, bins, time, bytes, rows, throughput and memory.
+
+        ``max_peak_rss_delta_mb`` is the largest peak RSS above entry in a single call;
+        ``process_peak_rss_mb`` is the process high-water mark, not per bin.
+        """
+        df = self.to_frame()
+        if df.empty:
+            return pd.DataFrame(columns=["stage", "calls", "bins", "total_s", "mean_s", "max_s",
+                                         "bytes_read", "rows", "rows_per_s", "mb_per_s",
+                                         "max_peak_rss_delta_mb", "process_peak_rss_mb", "errors"])
+        g = df.groupby("stage", sort=False)
+        out = pd.DataFrame({
+            "calls": g.size(),
+            "bins": g["bin"].nunique(),
+            "total_s": g["wall_s"].sum(),
+            "mean_s": g["wall_s"].mean(),
+            "max_s": g["wall_s"].max(),
+            "bytes_read": g["bytes_read"].sum(min_count=1),
+            "rows": g["rows"].sum(min_count=1),
+            "max_peak_rss_delta_mb": g["peak_rss_delta_mb"].max(),
+            "process_peak_rss_mb": g["process_peak_rss_mb"].max(),
+            "errors": g["error"].count(),
+        })
+        out["rows_per_s"] = out["rows"] / out["total_s"]
+        out["mb_per_s"] = out["bytes_read"] / 1e6 / out["total_s"]
+        out = out.reset_index().sort_values("total_s", ascending=False, ignore_index=True)
+        return out[["stage", "calls", "bins", "total_s", "mean_s", "max_s", "bytes_read", "rows",
+                    "rows_per_s", "mb_per_s", "max_peak_rss_delta_mb", "process_peak_rss_mb", "errors"]]
+
+    def to_csv(self, path: str | Path, aggregate: bool = False) -> Path:
+        path = Path(path)
+        (self.aggregate() if aggregate else self.to_frame()).to_csv(path, index=False)
+        return path
+
+    def to_json(self, path: str | Path) -> Path:
+        """Write ``{"stages": aggregate rows, "records": per-bin rows}``."""
+        path = Path(path)
+        payload = {
+            "stages": json.loads(self.aggregate().to_json(orient="records")),
+            "records": json.loads(self.to_frame().to_json(orient="records")),
+        }
+        path.write_text(json.dumps(payload, indent=2))
+        return path
+
+    def save(self, path: str | Path) -> Path:
+        """JSON (aggregates + records) for ``.json``, otherwise the aggregate CSV."""
+        path = Path(path)
+        return self.to_json(path) if path.suffix.lower() == ".json" else self.to_csv(path, aggregate=True)
+
+
+_enabled = False
+_recorder: Optional[StageRecorder] = None
+_callbacks: List[MetricsCallback] = []
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(recorder: Optional[StageRecorder] = None, callback: Optional[MetricsCallback] = None) -> StageRecorder:
+    """Start recording into ``recorder`` (a new one by default)."""
+    global _enabled, _recorder
+    _recorder = recorder or StageRecorder()
+    if callback is not None:
+        _callbacks.append(callback)
+    _enabled = True
+    return _recorder
+
+
+def disable() -> None:
+    global _enabled, _recorder
+    _enabled = False
+    _recorder = None
+    _callbacks.clear()
+
+
+@contextmanager
+def recording(callback: Optional[MetricsCallback] = None, enabled: bool = True) -> Iterator[StageRecorder]:
+    """Record stages inside the block; restores the previous state afterwards.
+
+    With ``enabled=False`` the block runs untimed and the recorder stays empty,
+    so CLIs can pass ``enabled=bool(args.timing)``.
+    """
+    global _enabled, _recorder
+    if not enabled:
+        yield StageRecorder()
+        return
+    prev = (_enabled, _recorder, list(_callbacks))
+    rec = enable(callback=callback)
+    try:
+        yield rec
+    finally:
+        _enabled, _recorder = prev[0], prev[1]
+        _callbacks[:] = prev[2]
+
+
+def _emit(record: StageRecord) -> None:
+    if _recorder is not None:
+        _recorder.add(record)
+    if _callbacks:
+        row = record.to_row()
+        for cb in _callbacks:
+            cb(row)
+
+
+_active_lock = threading.Lock()
+_active: List["_Stage"] = []
+
+
+class _Stage:
+    """Active stage; ``add()`` accumulates rows/bytes discovered inside the block."""
+
+    __slots__ = ("name", "bin", "rows", "bytes_read", "_t0", "_wall0", "_rss0", "_hwm", "_hwm_ok")
+
+    def __init__(self, name: str, bin: Optional[str], rows: Optional[int], bytes_read: Optional[int]):
+        self.name = name
+        self.bin = bin
+        self.rows = rows
+        self.bytes_read = bytes_read
+
+    def add(self, rows: Optional[int] = None, bytes_read: Optional[int] = None) -> None:
+        if rows is not None:
+            self.rows = (self.rows or 0) + int(rows)
+        if bytes_read is not None:
+            self.bytes_read = (self.bytes_read or 0) + int(bytes_read)
+
+    def __enter__(self) -> "_Stage":
+        global _process_peak_mb
+        self._wall0 = time.time()
+        with _active_lock:
+            self._rss0 = current_rss_mb()
+            # Fold the mark into every open stage (and the process peak) before wiping it
+            hwm = high_water_rss_mb()
+            if hwm is not None:
+                _process_peak_mb = max(_process_peak_mb, hwm)
+                for other in _active:
+                    other._hwm = max(other._hwm, hwm)
+            self._hwm_ok = hwm is not None and self._rss0 is not None and reset_high_water()
+            self._hwm = self._rss0 if self._hwm_ok else 0.0
+            _active.append(self)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        wall_s = time.perf_counter() - self._t0
+        with _active_lock:
+            _active.remove(self)
+            rss1 = current_rss_mb()
+            hwm = high_water_rss_mb() if self._hwm_ok else None
+        if hwm is not None:
+            delta = max(self._hwm, hwm) - self._rss0
+        elif rss1 is not None and self._rss0 is not None:
+            delta = rss1 - self._rss0
+        else:
+            delta = None
+        _emit(StageRecord(
+            stage=self.name,
+            bin=self.bin,
+            wall_s=wall_s,
+            bytes_read=self.bytes_read,
+            rows=self.rows,
+            peak_rss_delta_mb=delta,
+            process_peak_rss_mb=peak_rss_mb(),
+            started_at=self._wall0,
+            error=f"{exc_type.__name__}: {exc}" if exc_type is not None else None,
+        ))
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def add(self, rows: Optional[int] = None, bytes_read: Optional[int] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(
+    name: str,
+    bin: Optional[str] = None,
+    rows: Optional[int] = None,
+    bytes_read: Optional[int] = None,
+    path: Optional[str | Path] = None,
+):
+    """Context manager timing one stage (a no-op unless recording).
+
+    ``path`` sets ``bytes_read`` to that file's size; the stat only happens
+    while recording.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    if path is not None and bytes_read is None:
+        bytes_read = file_size(path)
+    return _Stage(name, bin, rows, bytes_read)
+
+
+def file_size(path: str | Path) -> Optional[int]:
+    """Size in bytes for ``bytes_read``; None if the file is missing."""
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return None
+
+
+def timed(name: str, bin_from: Optional[Callable[..., Optional[str]]] = None):
+    """Decorator form of ``stage``; ``bin_from(*args, **kwargs)`` names the bin."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name, bin_from(*args, **kwargs) if bin_from else None, None, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,327 @@
+"""Generate a synthetic on-disk IFCB corpus (.hdr/.adc/class CSV, optional .roi).
+
+SyntheticFPS simulates particle arrivals in memory only. This module writes
+complete bins so ingest, header standardization and summaries can be
+load-tested offline against a reproducible corpus of any size.
+
+Design goals:
+- Realistic trigger structure: Poisson arrivals with a non-paralyzable
+  inhibit window, so consecutive RunTime deltas are inhibit + exponential
+  and InhibitTime accumulates per trigger; a share of triggers are zero ROIs.
+- Valid ``ADCFileFormat:`` lines in several spellings (canonical, lower case,
+  snake_case, spaced words, legacy "trigger") that all resolve through
+  ``DEFAULT_ALIAS_MAP``.
+- Class CSVs in the ``<pid>_class_vNone.csv`` layout (pid_<RoiNumber> rows
+  for non-zero ROIs, one score column per class).
+- One ``SeedSequence`` child per bin, so the corpus is identical regardless
+  of worker count; bins are written in parallel by a process pool.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import argparse
+import csv
+import re
+
+import numpy as np
+import pandas as pd
+
+from adc_header_standardizer import CANONICAL_ADC_HEADERS, DEFAULT_ALIAS_MAP, _normalize_key
+
+
+TAXONOMY_MAP_PATH = Path(__file__).parent / "class_taxonomicSort" / "config" / "class_taxonomy_map.csv"
+
+HEADER_STYLES = ("canonical", "lower", "snake", "spaced", "legacy_trigger")
+
+INTEGER_COLUMNS = {
+    "trigger#", "RoiX", "RoiY", "RoiWidth", "RoiHeight", "StartByte",
+    "ComparatorOut", "StartPoint", "SignalLength", "Status",
+}
+
+
+# Tokens whose word boundaries are not plain CamelCase
+_IRREGULAR_WORDS = {
+    "ADCtime": ["ADC", "time"],
+    "PMTA": ["PMT", "A"],
+    "PMTB": ["PMT", "B"],
+    "PMTC": ["PMT", "C"],
+    "PMTD": ["PMT", "D"],
+}
+
+
+def _split_words(token: str) -> List[str]:
+    if token in _IRREGULAR_WORDS:
+        return _IRREGULAR_WORDS[token]
+    return re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", token) or [token]
+
+
+def header_tokens(style: str) -> List[str]:
+    """ADCFileFormat tokens in one spelling style; all map to the canonical schema."""
+    tokens = []
+    for tok in CANONICAL_ADC_HEADERS:
+        words = _split_words(tok)
+        if style == "canonical":
+            out = tok
+        elif style == "lower":
+            out = tok.lower()
+        elif style == "snake":
+            out = "_".join(w.lower() for w in words)
+        elif style == "spaced":
+            out = " ".join(w if w.isupper() else w.capitalize() for w in words)
+        elif style == "legacy_trigger":
+            out = "trigger" if tok == "trigger#" else tok
+        else:
+            raise ValueError(f"style must be one of {HEADER_STYLES}, got {style!r}")
+        if DEFAULT_ALIAS_MAP.get(_normalize_key(out)) != tok:
+            raise ValueError(f"Token {out!r} does not map back to {tok!r}")
+        tokens.append(out)
+    return tokens
+
+
+def default_class_names(n_classes: int) -> List[str]:
+    """First ``n_classes`` names from the taxonomy map, padded with generic names."""
+    names: List[str] = []
+    if TAXONOMY_MAP_PATH.exists():
+        names = pd.read_csv(TAXONOMY_MAP_PATH)["class_name"].astype(str).tolist()[:n_classes]
+    names += [f"class_{k:03d}" for k in range(len(names), n_classes)]
+    return names
+
+
+@dataclass
+class CorpusConfig:
+    n_bins: int = 100
+    rois_per_bin: int = 2000
+    n_classes: int = 20
+    instrument: str = "IFCB999"
+    start_time: str = "2024-01-01T00:00:00"
+    bin_interval_s: float = 1500.0
+    run_duration_s: float = 1200.0
+    inhibit_s: float = 0.08
+    inhibit_jitter_s: float = 0.004
+    zero_roi_fraction: float = 0.15
+    header_style_weights: Dict[str, float] = field(
+        default_factory=lambda: {"canonical": 0.6, "lower": 0.1, "snake": 0.1, "spaced": 0.1, "legacy_trigger": 0.1}
+    )
+    write_class_csv: bool = True
+    write_roi: bool = False
+    seed: Optional[int] = 0
+
+
+@dataclass
+class BinRecord:
+    pid: str
+    header_style: str
+    n_triggers: int
+    n_rois: int
+    runtime_final: float
+    inhibittime_final: float
+    bytes_written: int
+
+    def to_row(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+def simulate_triggers(rng: np.random.Generator, cfg: CorpusConfig) -> Dict[str, np.ndarray]:
+    """RunTime and cumulative InhibitTime for one bin's accepted triggers.
+
+    With Poisson arrivals and a non-paralyzable inhibit, the gap after each
+    accepted trigger is inhibit + Exponential(1/rate); the rate is chosen so
+    the expected trigger count over the run is ``rois_per_bin``.
+    """
+    n_target = max(1, rng.poisson(cfg.rois_per_bin))
+    mean_gap = cfg.run_duration_s / n_target
+    free_gap = max(mean_gap - cfg.inhibit_s, 1e-4)
+    inhibit = np.maximum(cfg.inhibit_s + cfg.inhibit_jitter_s * rng.standard_normal(n_target), 0.0)
+    gaps = inhibit + rng.exponential(free_gap, n_target)
+    runtime = np.cumsum(gaps) - inhibit[0] + rng.exponential(free_gap)
+    return {"RunTime": runtime, "InhibitTime": np.cumsum(inhibit) - inhibit[0]}
+
+
+def synthesize_adc(rng: np.random.Generator, cfg: CorpusConfig) -> pd.DataFrame:
+    """Canonical-column ADC table for one bin."""
+    trig = simulate_triggers(rng, cfg)
+    n = len(trig["RunTime"])
+    zero = rng.random(n) < cfg.zero_roi_fraction
+    width = np.where(zero, 0, np.clip(rng.lognormal(4.0, 0.6, n), 16, 1300)).astype(np.int64)
+    height = np.where(zero, 0, np.clip(rng.lognormal(3.7, 0.6, n), 16, 1000)).astype(np.int64)
+    x = np.where(zero, 0, rng.integers(1, 1300, n))
+    y = np.where(zero, 0, rng.integers(1, 1000, n))
+    nbytes = width * height
+    start_byte = np.concatenate([[0], np.cumsum(nbytes)[:-1]])
+    pmt = rng.lognormal(-2.0, 1.0, (n, 4))
+    peak = pmt * rng.uniform(1.5, 3.0, (n, 4))
+    grab_start = trig["RunTime"] + rng.uniform(0.001, 0.003, n)
+
+    df = pd.DataFrame({
+        "trigger#": np.arange(1, n + 1),
+        "ADCtime": trig["RunTime"] + rng.uniform(0.0, 1e-3, n),
+        "PMTA": pmt[:, 0], "PMTB": pmt[:, 1], "PMTC": pmt[:, 2], "PMTD": pmt[:, 3],
+        "PeakA": peak[:, 0], "PeakB": peak[:, 1], "PeakC": peak[:, 2], "PeakD": peak[:, 3],
+        "TimeOfFlight": rng.uniform(5.0, 200.0, n),
+        "GrabTimeStart": grab_start,
+        "GrabTimeEnd": grab_start + rng.uniform(0.005, 0.02, n),
+        "RoiX": x, "RoiY": y, "RoiWidth": width, "RoiHeight": height,
+        "StartByte": np.where(zero, 0, start_byte),
+        "ComparatorOut": rng.integers(0, 2, n),
+        "StartPoint": rng.integers(0, 500, n),
+        "SignalLength": rng.integers(100, 2000, n),
+        "Status": np.zeros(n, dtype=np.int64),
+        "RunTime": trig["RunTime"],
+        "InhibitTime": trig["InhibitTime"],
+    })
+    return df[CANONICAL_ADC_HEADERS]
+
+
+def _hdr_text(tokens: Sequence[str], adc: pd.DataFrame) -> str:
+    runtime = float(adc["RunTime"].iloc[-1]) if len(adc) else 0.0
+    inhibit = float(adc["InhibitTime"].iloc[-1]) if len(adc) else 0.0
+    lines = [
+        "softwareVersion: synthetic",
+        f"runTime: {runtime:.6f}",
+        f"inhibitTime: {inhibit:.6f}",
+        f"triggerCount: {len(adc)}",
+        "ADCFileFormat: " + ", ".join(tokens),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _write_adc(path: Path, adc: pd.DataFrame) -> None:
+    fmt = ["%d" if c in INTEGER_COLUMNS else "%.6f" for c in adc.columns]
+    np.savetxt(path, adc.to_numpy(dtype=float), delimiter=",", fmt=fmt)
+
+
+def _write_class_csv(path: Path, pid: str, adc: pd.DataFrame, class_names: Sequence[str], rng: np.random.Generator) -> int:
+    roi_numbers = np.flatnonzero(adc["RoiWidth"].to_numpy() > 0) + 1
+    n = len(roi_numbers)
+    # Peaked scores: a few dominant classes per bin, Dirichlet noise per ROI
+    prevalence = rng.dirichlet(np.full(len(class_names), 0.5))
+    top = rng.choice(len(class_names), size=n, p=prevalence)
+    scores = rng.dirichlet(np.full(len(class_names), 0.3), size=n)
+    scores[np.arange(n), top] += 1.0
+    scores /= scores.sum(axis=1, keepdims=True)
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["pid", *class_names])
+        for roi, row in zip(roi_numbers, scores):
+            writer.writerow([f"{pid}_{roi:05d}", *(f"{s:.4f}" for s in row)])
+    return n
+
+
+def write_bin(
+    out_dir: str | Path,
+    pid: str,
+    cfg: CorpusConfig,
+    seed: np.random.SeedSequence,
+    class_names: Sequence[str],
+) -> BinRecord:
+    """Write one bin's files and return its record."""
+    rng = np.random.default_rng(seed)
+    out_dir = Path(out_dir)
+    styles = list(cfg.header_style_weights)
+    weights = np.array([cfg.header_style_weights[s] for s in styles], dtype=float)
+    style = styles[rng.choice(len(styles), p=weights / weights.sum())]
+
+    adc = synthesize_adc(rng, cfg)
+    hdr_path = out_dir / f"{pid}.hdr"
+    adc_path = out_dir / f"{pid}.adc"
+    hdr_path.write_text(_hdr_text(header_tokens(style), adc))
+    _write_adc(adc_path, adc)
+    written = [hdr_path, adc_path]
+
+    n_rois = int((adc["RoiWidth"] > 0).sum())
+    if cfg.write_class_csv:
+        class_path = out_dir / f"{pid}_class_vNone.csv"
+        _write_class_csv(class_path, pid, adc, class_names, rng)
+        written.append(class_path)
+    if cfg.write_roi:
+        roi_path = out_dir / f"{pid}.roi"
+        total = int((adc["RoiWidth"] * adc["RoiHeight"]).sum())
+        roi_path.write_bytes(rng.integers(0, 256, total, dtype=np.uint8).tobytes())
+        written.append(roi_path)
+
+    return BinRecord(
+        pid=pid,
+        header_style=style,
+        n_triggers=len(adc),
+        n_rois=n_rois,
+        runtime_final=float(adc["RunTime"].iloc[-1]),
+        inhibittime_final=float(adc["InhibitTime"].iloc[-1]),
+        bytes_written=sum(p.stat().st_size for p in written),
+    )
+
+
+def _write_bin_job(job) -> BinRecord:
+    return write_bin(*job)
+
+
+def bin_pids(cfg: CorpusConfig) -> List[str]:
+    """Dashboard-style pids (DYYYYMMDDTHHMMSS_IFCBnnn) spaced ``bin_interval_s`` apart."""
+    start = pd.Timestamp(cfg.start_time)
+    times = start + pd.to_timedelta(np.arange(cfg.n_bins) * cfg.bin_interval_s, unit="s")
+    return [f"D{t:%Y%m%dT%H%M%S}_{cfg.instrument}" for t in times]
+
+
+def generate_corpus(
+    out_dir: str | Path,
+    cfg: CorpusConfig = CorpusConfig(),
+    *,
+    max_workers: Optional[int] = None,
+    manifest_name: str = "manifest.csv",
+) -> pd.DataFrame:
+    """Write ``cfg.n_bins`` bins into ``out_dir`` and a manifest CSV.
+
+    ``max_workers=1`` writes in-process. Returns the manifest (one row per bin).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    class_names = default_class_names(cfg.n_classes)
+    seeds = np.random.SeedSequence(cfg.seed).spawn(cfg.n_bins)
+    jobs = [(out_dir, pid, cfg, s, class_names) for pid, s in zip(bin_pids(cfg), seeds)]
+
+    if max_workers == 1:
+        records = [_write_bin_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            records = list(pool.map(_write_bin_job, jobs, chunksize=4))
+
+    manifest = pd.DataFrame([r.to_row() for r in records])
+    manifest.to_csv(out_dir / manifest_name, index=False)
+    return manifest
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic IFCB .hdr/.adc/class CSV corpus")
+    parser.add_argument("out_dir", type=str, help="Output directory")
+    parser.add_argument("--bins", type=int, default=100, help="Number of bins (default: 100)")
+    parser.add_argument("--rois-per-bin", type=int, default=2000, help="Mean triggers per bin (default: 2000)")
+    parser.add_argument("--classes", type=int, default=20, help="Number of classes (default: 20)")
+    parser.add_argument("--instrument", type=str, default="IFCB999")
+    parser.add_argument("--start-time", type=str, default="2024-01-01T00:00:00")
+    parser.add_argument("--roi", action="store_true", help="Also write .roi files with random pixels")
+    parser.add_argument("--no-class", action="store_true", help="Skip class CSVs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    cfg = CorpusConfig(
+        n_bins=args.bins,
+        rois_per_bin=args.rois_per_bin,
+        n_classes=args.classes,
+        instrument=args.instrument,
+        start_time=args.start_time,
+        write_class_csv=not args.no_class,
+        write_roi=args.roi,
+        seed=args.seed,
+    )
+    manifest = generate_corpus(args.out_dir, cfg, max_workers=args.workers)
+    total_mb = manifest["bytes_written"].sum() / 1e6
+    print(f"Wrote {len(manifest):,} bins ({total_mb:,.1f} MB) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -1,6 +1,9 @@
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from pathlib import Path
 
 def extract_adc_headers(hdr_file_path):
@@ -72,6 +75,109 @@ def main_loop(data_dir):
         else:
             print(f'Skipping incomplete set for: {hdr_file.stem}')
 
+# ---- Parallel rendering -------------------------------------------------------
+# Same figure as generate_plot, drawn through the object-oriented Agg API (no
+# pyplot state, safe in worker processes). Each worker builds the figure once
+# and only swaps line data per bin; bins whose PNG is newer than all of their
+# inputs are skipped.
+
+class PlotTemplate:
+    """Reusable Agg figure for the per-bin Alexandrium plot."""
+
+    def __init__(self, figsize=(10, 6), dpi=100):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax1 = self.fig.add_subplot(111)
+        self.alex_line, = self.ax1.plot([], [], color='green', label='Total Alexandrium')
+        self.ax1.set_xlabel('Run Time (minutes)')
+        self.ax1.set_ylabel('Cumulative Alexandrium Count', color='green')
+        self.ax1.tick_params(axis='y', labelcolor='green')
+
+        self.ax2 = self.ax1.twinx()
+        self.vol_line, = self.ax2.plot([], [], color='blue', linestyle='--', label='Volume Analyzed')
+        self.ax2.set_ylabel('Volume Analyzed (mL)', color='blue')
+        self.ax2.tick_params(axis='y', labelcolor='blue')
+        self.ax2.set_title('Alexandrium Concentration vs Volume Analyzed')
+        # Fixed margins instead of tight_layout on every plot
+        self.fig.subplots_adjust(left=0.1, right=0.9, bottom=0.1, top=0.93)
+
+    def render(self, df, outpath):
+        self.alex_line.set_data(df['RunTime'].to_numpy(), df['TotalAlexandrium'].to_numpy())
+        self.vol_line.set_data(df['RunTime'].to_numpy(), df['VolumeAnalyzed'].to_numpy())
+        for ax in (self.ax1, self.ax2):
+            ax.relim()
+            ax.autoscale_view()
+        self.fig.savefig(outpath)
+
+
+_TEMPLATE = None
+
+
+def _template():
+    global _TEMPLATE
+    if _TEMPLATE is None:
+        _TEMPLATE = PlotTemplate()
+    return _TEMPLATE
+
+
+def plot_is_fresh(plot_file, input_files):
+    """True if plot_file exists and is newer than every input file."""
+    if not plot_file.exists():
+        return False
+    built = plot_file.stat().st_mtime
+    return all(built >= f.stat().st_mtime for f in input_files)
+
+
+def _render_bin(job):
+    hdr_file, adc_file, class_file, plot_file = job
+    try:
+        adc_df = load_adc_data(adc_file, hdr_file)
+        class_df = load_class_data(class_file)
+        merged_df = process_pair(adc_df, class_df)
+        _template().render(merged_df, plot_file)
+        return hdr_file.stem, None
+    except Exception as e:  # report and keep rendering the other bins
+        return hdr_file.stem, f'{type(e).__name__}: {e}'
+
+
+def render_directory(data_dir, max_workers=None, overwrite=False):
+    """Parallel main_loop: render stale/missing plots only.
+
+    Returns a dict with the rendered, skipped (up to date), incomplete and
+    failed bin names. max_workers=1 renders in-process.
+    """
+    data_path = Path(data_dir)
+    jobs = []
+    summary = {'rendered': [], 'skipped': [], 'incomplete': [], 'failed': {}}
+    for hdr_file in sorted(data_path.rglob('*.hdr')):
+        adc_file = hdr_file.with_suffix('.adc')
+        class_file = hdr_file.with_name(hdr_file.stem + '_class_vNone.csv')
+        if not (adc_file.exists() and class_file.exists()):
+            summary['incomplete'].append(hdr_file.stem)
+            continue
+        plot_file = data_path / f'{hdr_file.stem}_alexandrium_plot.png'
+        if not overwrite and plot_is_fresh(plot_file, [hdr_file, adc_file, class_file]):
+            summary['skipped'].append(hdr_file.stem)
+            continue
+        jobs.append((hdr_file, adc_file, class_file, plot_file))
+
+    if max_workers == 1:
+        results = [_render_bin(job) for job in jobs]
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_render_bin, jobs, chunksize=4))
+    else:
+        results = []
+
+    for name, error in results:
+        if error is None:
+            summary['rendered'].append(name)
+        else:
+            summary['failed'][name] = error
+    print(f"Rendered {len(summary['rendered'])}, up to date {len(summary['skipped'])}, "
+          f"incomplete {len(summary['incomplete'])}, failed {len(summary['failed'])}")
+    return summary
+
 # Example usage
 if __name__ == '__main__':
     main_loop('./your_data_directory')  # <- Replace with actual path
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""Batched OLS with Newey-West (HAC) standard errors for many short series.
+
+PiecewiseInhibitProbability fits ``p_inhib ~ time_s`` with one
+``sm.OLS(y, X).fit(cov_type='HAC', cov_kwds={'maxlags': 5})`` per subset.
+Per-bin or per-day slopes turn that into tens of thousands of statsmodels
+calls, each dominated by fixed overhead. This module solves a whole stack of
+small regressions at once and reproduces the statsmodels numbers.
+
+Design goals:
+- Series are packed into ``(n_series, n_obs, k)`` / ``(n_series, n_obs)``
+  arrays with a validity mask. Missing rows are moved to the end of their
+  series, which matches ``missing='drop'``: lags run across the gap exactly
+  as they do after statsmodels drops the rows. Their residuals are zeroed,
+  so padding never enters a sum.
+- Normal equations, residuals and the lagged score cross-products are
+  stacked ``matmul`` calls over the series axis (plain ``einsum`` is an
+  order of magnitude slower for these tiny k x k blocks). The only Python
+  loop is over lags (at most ``maxlags``). ``X'X`` is scaled to a unit
+  diagonal before the pseudo-inverse so raw ``time_s`` regressors stay well
+  conditioned.
+- The HAC covariance follows ``statsmodels.stats.sandwich_covariance``:
+  Bartlett weights ``1 - l / (maxlags + 1)``, no small-sample correction
+  unless ``use_correction=True``, and normal-based p-values and confidence
+  intervals unless ``use_t=True``. ``maxlags=None`` uses the
+  ``floor(4 (n/100)^(2/9))`` rule per series.
+- Series are processed in chunks capped at ``max_cells`` values, which keeps
+  memory flat when there are many series.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Mapping, Optional, Sequence, Tuple
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+DEFAULT_MAXLAGS = 5
+
+# Series x observations x regressors per chunk
+DEFAULT_MAX_CELLS = 4_000_000
+
+
+@dataclass
+class BatchedOLSResult:
+    """Per-series estimates; each array has the series as its leading axis."""
+
+    params: np.ndarray
+    cov_params: np.ndarray
+    nobs: np.ndarray
+    df_resid: np.ndarray
+    rsquared: np.ndarray
+    rsquared_adj: np.ndarray
+    maxlags: np.ndarray
+    use_t: bool = False
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    @property
+    def bse(self) -> np.ndarray:
+        return np.sqrt(np.diagonal(self.cov_params, axis1=1, axis2=2))
+
+    @property
+    def tvalues(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.params / self.bse
+
+    @property
+    def pvalues(self) -> np.ndarray:
+        z = np.abs(self.tvalues)
+        if self.use_t:
+            return 2 * stats.t.sf(z, self.df_resid[:, None])
+        return 2 * stats.norm.sf(z)
+
+    def conf_int(self, alpha: float = 0.05) -> np.ndarray:
+        """``(n_series, k, 2)`` lower/upper bounds."""
+        if self.use_t:
+            q = stats.t.ppf(1 - alpha / 2, self.df_resid)[:, None]
+        else:
+            q = stats.norm.ppf(1 - alpha / 2)
+        half = q * self.bse
+        return np.stack([self.params - half, self.params + half], axis=-1)
+
+    def to_frame(
+        self,
+        labels: Optional[Sequence] = None,
+        param_names: Optional[Sequence[str]] = None,
+        alpha: float = 0.05,
+    ) -> pd.DataFrame:
+        """One row per series with estimate, SE, p-value and CI for every parameter."""
+        k = self.params.shape[1]
+        names = list(param_names) if param_names is not None else [f"x{i}" for i in range(k)]
+        ci = self.conf_int(alpha)
+        bse, pvalues = self.bse, self.pvalues
+        out = pd.DataFrame({"nobs": self.nobs, "maxlags": self.maxlags})
+        if labels is not None:
+            out.insert(0, "label", list(labels))
+        for j, name in enumerate(names):
+            out[name] = self.params[:, j]
+            out[f"{name}_se"] = bse[:, j]
+            out[f"{name}_pvalue"] = pvalues[:, j]
+            out[f"{name}_ci_low"] = ci[:, j, 0]
+            out[f"{name}_ci_high"] = ci[:, j, 1]
+        out["rsquared"] = self.rsquared
+        out["rsquared_adj"] = self.rsquared_adj
+        return out
+
+
+def hac_lags(nobs: np.ndarray, maxlags: Optional[int] = DEFAULT_MAXLAGS) -> np.ndarray:
+    """Lags per series: ``maxlags`` if given, else the Newey-West rule of thumb."""
+    nobs = np.asarray(nobs)
+    if maxlags is not None:
+        return np.full(nobs.shape, int(maxlags), dtype=np.int64)
+    return np.floor(4 * (nobs / 100.0) ** (2.0 / 9.0)).astype(np.int64)
+
+
+def bartlett_weights(lags: np.ndarray) -> np.ndarray:
+    """``(n_series, max(lags) + 1)`` Bartlett weights, zero past each series' lag."""
+    lags = np.asarray(lags, dtype=np.int64)
+    width = int(lags.max()) + 1 if lags.size else 1
+    ell = np.arange(width)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = 1.0 - ell / (lags[:, None] + 1.0)
+    return np.where(ell <= lags[:, None], w, 0.0)
+
+
+def _compact(X: np.ndarray, y: np.ndarray, valid: np.ndarray):
+    """Move valid rows to the front of each series (stable), zeroing the rest."""
+    if not np.all(valid[:, :-1] >= valid[:, 1:]):
+        order = np.argsort(~valid, axis=1, kind="stable")
+        X = np.take_along_axis(X, order[:, :, None], axis=1)
+        y = np.take_along_axis(y, order, axis=1)
+        valid = np.take_along_axis(valid, order, axis=1)
+    X = np.where(valid[:, :, None], X, 0.0)
+    y = np.where(valid, y, 0.0)
+    return X, y, valid
+
+
+def _fit_chunk(X: np.ndarray, y: np.ndarray, valid: np.ndarray, lags: np.ndarray, use_correction: bool):
+    n_series, n_obs, k = X.shape
+    nobs = valid.sum(axis=1)
+
+    XT = X.transpose(0, 2, 1)
+    xtx = XT @ X
+    scale = np.sqrt(np.diagonal(xtx, axis1=1, axis2=2))
+    scale = np.where(scale == 0, 1.0, scale)
+    outer = scale[:, :, None] * scale[:, None, :]
+    unit = xtx / outer
+    hinv = np.linalg.pinv(unit, hermitian=True) / outer
+    params = (hinv @ (XT @ y[:, :, None]))[:, :, 0]
+    resid = (y - (X @ params[:, :, None])[:, :, 0]) * valid
+
+    scores = X * resid[:, :, None]
+    scoresT = scores.transpose(0, 2, 1)
+    weights = bartlett_weights(lags)
+    meat = scoresT @ scores
+    for lag in range(1, min(weights.shape[1], n_obs)):
+        gamma = scoresT[:, :, lag:] @ scores[:, :-lag]
+        meat += weights[:, lag, None, None] * (gamma + gamma.transpose(0, 2, 1))
+    cov = hinv @ meat @ hinv
+
+    rank = np.linalg.matrix_rank(unit, hermitian=True)
+    df_resid = nobs - rank
+    if use_correction:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov *= (nobs / (nobs - k))[:, None, None]
+
+    # statsmodels treats a column that is constant and nonzero as the intercept;
+    # rows are compacted, so row 0 is valid whenever the series is non-empty
+    first = X[:, :1, :]
+    has_const = (((X == first) | ~valid[:, :, None]).all(axis=1) & (first[:, 0] != 0)).any(axis=1)
+
+    ssr = (resid * resid).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ybar = np.where(has_const, y.sum(axis=1) / nobs, 0.0)
+        centered = (y - ybar[:, None]) * valid
+        tss = (centered * centered).sum(axis=1)
+        rsquared = 1 - ssr / tss
+        rsquared_adj = 1 - (nobs - has_const) / df_resid * (1 - rsquared)
+
+    bad = nobs <= rank
+    params[bad] = np.nan
+    cov[bad] = np.nan
+    rsquared[bad] = np.nan
+    rsquared_adj[bad] = np.nan
+    return params, cov, nobs, df_resid, rsquared, rsquared_adj
+
+
+def ols_batched(
+    X: np.ndarray,
+    y: np.ndarray,
+    mask: Optional[np.ndarray] = None,
+    maxlags: Optional[int] = DEFAULT_MAXLAGS,
+    use_correction: bool = False,
+    use_t: bool = False,
+    max_cells: int = DEFAULT_MAX_CELLS,
+) -> BatchedOLSResult:
+    """Fit ``y[s] ~ X[s]`` for every series ``s`` with HAC covariances.
+
+    ``X`` is ``(n_series, n_obs, k)`` (include the constant column yourself,
+    as with ``sm.add_constant``) and ``y`` is ``(n_series, n_obs)``. Rows are
+    used when ``mask`` (if given) is true and ``y`` and every regressor are
+    finite. Each series must be in time order. A series with no more valid
+    rows than its rank gets NaN estimates.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if X.ndim != 3 or y.shape != X.shape[:2]:
+        raise ValueError(f"expected X (n_series, n_obs, k) and y (n_series, n_obs); got {X.shape} and {y.shape}")
+    valid = np.isfinite(y) & np.isfinite(X).all(axis=2)
+    if mask is not None:
+        valid &= np.asarray(mask, dtype=bool)
+    X, y, valid = _compact(X, y, valid)
+
+    n_series, n_obs, k = X.shape
+    lags = hac_lags(valid.sum(axis=1), maxlags)
+    chunk = max(1, max_cells // max(n_obs * k, 1))
+    parts = [
+        _fit_chunk(X[i:i + chunk], y[i:i + chunk], valid[i:i + chunk], lags[i:i + chunk], use_correction)
+        for i in range(0, n_series, chunk)
+    ]
+    if not parts:
+        empty = np.empty(0)
+        return BatchedOLSResult(np.empty((0, k)), np.empty((0, k, k)), empty, empty, empty, empty, lags, use_t)
+    params, cov, nobs, df_resid, rsquared, rsquared_adj = (np.concatenate(a) for a in zip(*parts))
+    return BatchedOLSResult(params, cov, nobs, df_resid, rsquared, rsquared_adj, lags, use_t)
+
+
+def pack_series(series: Sequence[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stack ``(x, y)`` pairs of unequal length into padded ``(x, y, mask)`` arrays."""
+    lengths = np.array([len(x) for x, _ in series], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    xs = np.full((len(series), width), np.nan)
+    ys = np.full((len(series), width), np.nan)
+    for i, (x, y) in enumerate(series):
+        xs[i, :lengths[i]] = x
+        ys[i, :lengths[i]] = y
+    mask = np.arange(width) < lengths[:, None]
+    return xs, ys, mask
+
+
+def _trend_design(x: np.ndarray) -> np.ndarray:
+    return np.stack([np.ones_like(x), x], axis=-1)
+
+
+def fit_trends(
+    frames: Mapping[str, pd.DataFrame],
+    x_col: str = "time_s",
+    y_col: str = "p_inhib",
+    maxlags: Optional[int] = DEFAULT_MAXLAGS,
+    alpha: float = 0.05,
+    **kwargs,
+) -> pd.DataFrame:
+    """``y_col ~ const + x_col`` for each labelled frame (e.g. the notebook's ``grid_dfs``)."""
+    labels = list(frames)
+    x, y, mask = pack_series([(frames[k][x_col].to_numpy(float), frames[k][y_col].to_numpy(float)) for k in labels])
+    result = ols_batched(_trend_design(x), y, mask, maxlags=maxlags, **kwargs)
+    return result.to_frame(labels, ["intercept", "slope"], alpha)
+
+
+def fit_trend_groups(
+    df: pd.DataFrame,
+    group_cols: str | List[str],
+    x_col: str = "time_s",
+    y_col: str = "p_inhib",
+    maxlags: Optional[int] = DEFAULT_MAXLAGS,
+    alpha: float = 0.05,
+    **kwargs,
+) -> pd.DataFrame:
+    """Per-group trends from one long frame (per bin, per day, ...).
+
+    Rows keep their order within each group, so the frame should already be
+    sorted by time. Rows with a missing group key are dropped.
+    """
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+    grouped = df.groupby(group_cols, sort=True)
+    gid = grouped.ngroup()
+    keep = gid.notna().to_numpy()
+    gid = gid.to_numpy()[keep].astype(np.int64)
+    pos = grouped.cumcount().to_numpy()[keep].astype(np.int64)
+    n_groups = grouped.ngroups
+    width = int(pos.max()) + 1 if len(pos) else 0
+
+    x = np.full((n_groups, width), np.nan)
+    y = np.full((n_groups, width), np.nan)
+    mask = np.zeros((n_groups, width), dtype=bool)
+    x[gid, pos] = df[x_col].to_numpy(float)[keep]
+    y[gid, pos] = df[y_col].to_numpy(float)[keep]
+    mask[gid, pos] = True
+
+    result = ols_batched(_trend_design(x), y, mask, maxlags=maxlags, **kwargs)
+    out = result.to_frame(param_names=["intercept", "slope"], alpha=alpha)
+    keys = grouped.size().index.to_frame(index=False)
+    return pd.concat([keys, out], axis=1)
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Batched OLS trends with Newey-West standard errors")
+    parser.add_argument("csv", nargs="+", help="CSV files; each file is a series unless --group-col is given")
+    parser.add_argument("--group-col", type=str, nargs="*", default=None)
+    parser.add_argument("--x-col", type=str, default="time_s")
+    parser.add_argument("--y-col", type=str, default="p_inhib")
+    parser.add_argument("--maxlags", type=int, default=DEFAULT_MAXLAGS, help="HAC lags; negative for the rule of thumb")
+    parser.add_argument("--use-t", action="store_true")
+    parser.add_argument("--output", type=str, default=None, help="CSV path for the results")
+    args = parser.parse_args()
+
+    kwargs = dict(
+        x_col=args.x_col,
+        y_col=args.y_col,
+        maxlags=args.maxlags if args.maxlags >= 0 else None,
+        use_t=args.use_t,
+    )
+    if args.group_col:
+        df = pd.concat([pd.read_csv(p) for p in args.csv], ignore_index=True)
+        results = fit_trend_groups(df, args.group_col, **kwargs)
+    else:
+        results = fit_trends({Path(p).stem: pd.read_csv(p) for p in args.csv}, **kwargs)
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Wrote {len(results):,} rows to {args.output}")
+    else:
+        print(results.to_string(index=False))
+
+
+if __name__ == "__main__":
+    _cli()
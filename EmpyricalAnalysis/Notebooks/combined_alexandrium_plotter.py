@@ -3,6 +3,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from decimated_plots import decimate_frame
+
 def extract_adc_headers(hdr_file_path):
     with open(hdr_file_path, 'r') as file:
         for line in file:
@@ -74,7 +76,13 @@ def process_pair(adc_df, class_df):
 if __name__ == '__main__':
     main_loop('./your_data_directory')  # <- Replace with actual path
 
-def main_loop(data_dir):
+def main_loop(data_dir, max_buckets=2000):
+    """Combined plot over all bins.
+
+    Each source is min/max-decimated to at most ``4 * max_buckets`` points
+    (pass None to plot every ROI), so only the decimated rows are kept in
+    memory.
+    """
     data_path = Path(data_dir)
     all_data = []
 
@@ -88,7 +96,9 @@ def main_loop(data_dir):
             class_df = load_class_data(class_file)
             merged_df = process_pair(adc_df, class_df)
             merged_df['Source'] = hdr_file.stem
-            all_data.append(merged_df)
+            if max_buckets:
+                merged_df = decimate_frame(merged_df, 'RunTime', ['TotalAlexandrium', 'VolumeAnalyzed'], max_buckets)
+            all_data.append(merged_df[['Source', 'RunTime', 'TotalAlexandrium', 'VolumeAnalyzed']])
         else:
             print(f'Skipping incomplete set for: {hdr_file.stem}')
 
@@ -102,7 +112,7 @@ def main_loop(data_dir):
     # Create the plot with dual y-axis and color-coded Source
     fig, ax1 = plt.subplots(figsize=(12, 7))
 
-    colors = plt.cm.get_cmap('tab10', len(combined_df['Source'].unique()))
+    colors = plt.get_cmap('tab10', len(combined_df['Source'].unique()))
     source_to_color = {src: colors(i) for i, src in enumerate(combined_df['Source'].unique())}
 
     for src, group in combined_df.groupby('Source'):
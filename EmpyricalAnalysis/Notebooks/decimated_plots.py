@@ -0,0 +1,250 @@
+"""Decimation and collection-based drawing for per-ROI time series plots.
+
+Plots over hundreds of bins (the combined Alexandrium plot, the stacked
+instrument-state timelines in LookTimeProportion) draw every ROI, one artist
+per segment in the timeline case. This module reduces what reaches the
+renderer without changing what ends up on screen.
+
+Design goals:
+- ``minmax_decimate`` keeps the first, last, min and max point of every
+  pixel-wide x bucket, so the drawn polyline covers exactly the same vertical
+  extent per pixel as the full series (error bounded by one pixel in x).
+  ``lttb`` (Largest-Triangle-Three-Buckets) is available when a fixed point
+  budget matters more than exact extrema.
+- Timeline strips are built vectorized from RunTime/InhibitTime deltas with
+  the same jitter/clamp rules as the notebook loop, run-length merged (touching
+  segments in the same state become one), and drawn as one ``broken_barh``
+  collection per sample. Strip height is the notebook's 20 pt line width
+  converted to data units from the laid-out axes, so strips are as thick as
+  the notebook's ``ax.plot(..., linewidth=20)`` segments.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def minmax_decimate(x, y, n_buckets: int = 2000) -> np.ndarray:
+    """Indices to keep: first/last/min/max per equal-width x bucket.
+
+    ``x`` must be sorted ascending; NaN ``y`` values are dropped. Returns
+    sorted indices into the input (at most ``4 * n_buckets``).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(valid) <= 4 * n_buckets:
+        return valid
+    xv, yv = x[valid], y[valid]
+    span = xv[-1] - xv[0]
+    bucket = np.minimum(((xv - xv[0]) / span * n_buckets).astype(np.int64), n_buckets - 1) if span > 0 else np.zeros(len(xv), dtype=np.int64)
+
+    # x sorted => buckets are contiguous runs
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(xv)] - 1
+    order = np.lexsort((yv, bucket))  # by bucket, then y
+    # Within each bucket the first entry of ``order`` is the min, the last the max
+    keep = np.concatenate([starts, ends, order[starts], order[ends]])
+    return valid[np.unique(keep)]
+
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling; returns sorted indices."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    xv, yv = x[valid], y[valid]
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        nhi = max(nhi, nlo + 1)
+        cx, cy = xv[nlo:nhi].mean(), yv[nlo:nhi].mean()
+        area = np.abs((xv[a] - cx) * (yv[lo:hi] - yv[a]) - (xv[a] - xv[lo:hi]) * (cy - yv[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return valid[out]
+
+
+def decimate_frame(df: pd.DataFrame, x: str, ys: Sequence[str], n_buckets: int = 2000) -> pd.DataFrame:
+    """Rows of ``df`` (sorted by ``x``) kept by min/max decimation of any of ``ys``."""
+    df = df.sort_values(x, kind="stable")
+    keep = np.unique(np.concatenate([minmax_decimate(df[x].to_numpy(), df[c].to_numpy(), n_buckets) for c in ys]))
+    return df.iloc[keep]
+
+
+# ---- instrument-state timelines --------------------------------------------
+
+INHIBITED, RUNNING = 1, 0
+
+
+def timeline_segments(runtime, inhibittime, abs_tol: float = 1e-6) -> Dict[str, np.ndarray]:
+    """Run-length-merged inhibited/running segments for one sample.
+
+    Same rules as ``plot_directory_timelines_time_inhibit_first``: for each
+    trigger interval the inhibited part (ΔInhibitTime, jitter below
+    ``abs_tol`` dropped, clamped to ΔRunTime) comes first, the rest is
+    running. Returns ``start``, ``width`` and ``state`` arrays plus the
+    unmerged totals ``total_inhibited_s`` / ``total_running_s``.
+    """
+    x = np.asarray(runtime, dtype=float)
+    inhib = np.asarray(inhibittime, dtype=float)
+    dt = np.diff(x)
+    dI = np.diff(inhib)
+
+    dI = np.where(dI > abs_tol, dI, 0.0)
+    dt = np.where(np.isfinite(dt), dt, 0.0)
+    dI = np.where(np.isfinite(dI), dI, 0.0)
+    dt = np.where(dt < 0, 0.0, dt)
+    dI = np.clip(dI, 0.0, dt)
+
+    x0, x1 = x[:-1], x[1:]
+    ok = np.isfinite(x0) & np.isfinite(x1) & (x1 > x0)
+    x0, x1, di = x0[ok], x1[ok], dI[ok]
+    dr = dt[ok] - di
+    mid = x0 + di
+
+    # Interleave [inhibited, running] per interval, then drop empty pieces
+    starts = np.column_stack([x0, mid]).ravel()
+    ends = np.column_stack([mid, x1]).ravel()
+    state = np.tile([INHIBITED, RUNNING], len(x0))
+    present = np.column_stack([di > 0, dr > 0]).ravel()
+    starts, ends, state = starts[present], ends[present], state[present]
+
+    totals = {
+        "total_inhibited_s": float(di[di > 0].sum()),
+        "total_running_s": float(dr[dr > 0].sum()),
+    }
+    if len(starts) == 0:
+        return {"start": starts, "width": starts.copy(), "state": state, **totals}
+
+    # Merge a segment into its predecessor when it touches it in the same state
+    new_run = np.r_[True, (state[1:] != state[:-1]) | (starts[1:] != ends[:-1])]
+    first = np.flatnonzero(new_run)
+    last = np.r_[first[1:], len(starts)] - 1
+    return {
+        "start": starts[first],
+        "width": ends[last] - starts[first],
+        "state": state[first],
+        **totals,
+    }
+
+
+def plot_timeline_records(
+    records: List[Tuple[str, pd.DataFrame]],
+    abs_tol: float = 1e-6,
+    save_path: Optional[str] = None,
+    line_spacing: float = 0.2,
+    bar_height: Optional[float] = None,
+    linewidth_pt: float = 20.0,
+    dpi: int = 300,
+    show: bool = True,
+):
+    """Stacked state strips, one ``broken_barh`` collection per sample.
+
+    ``bar_height`` (data units) defaults to ``linewidth_pt`` points, the line
+    width the notebook draws each strip with. Returns ``(summary_df, fig)``
+    with the notebook's summary columns.
+    """
+    import matplotlib.pyplot as plt
+
+    xmax = max(float(df["RunTime"].max()) for _, df in records)
+    fig, ax = plt.subplots(figsize=(14, 1.1 * len(records) + 1))
+    colors = np.array(["blue", "red"], dtype=object)
+
+    # Lay out the axes first so a point width can be converted to data units
+    names = [name for name, _ in records]
+    ytick_locs = [float(i) * line_spacing for i in range(len(records))]
+    ax.set_xlim(0, xmax)
+    ax.set_ylim(-line_spacing, len(records) * line_spacing)
+    ax.set_yticks(ytick_locs)
+    ax.set_yticklabels(names, fontsize=9)
+    ax.set_xlabel("Run Time (s)")
+    ax.set_title("Instrument State Over Time (red = inhibited first, blue = running/waiting)")
+    ax.grid(False)
+    for sp in ["right", "top"]:
+        ax.spines[sp].set_visible(False)
+    fig.tight_layout()
+    if bar_height is None:
+        axes_height_pt = ax.get_position().height * fig.get_figheight() * 72
+        bar_height = linewidth_pt * (len(records) + 1) * line_spacing / axes_height_pt
+
+    summaries = []
+    for y0, (name, df) in zip(ytick_locs, records):
+        seg = timeline_segments(df["RunTime"].to_numpy(), df["InhibitTime"].to_numpy(), abs_tol)
+        if len(seg["start"]):
+            ax.broken_barh(
+                np.column_stack([seg["start"], seg["width"]]),
+                (y0 - bar_height / 2, bar_height),
+                facecolors=list(colors[seg["state"]]),
+                edgecolor="none",
+                linewidth=0,
+            )
+        summaries.append({
+            "Sample": name,
+            "total_elapsed_s": seg["total_running_s"] + seg["total_inhibited_s"],
+            "total_running_s": seg["total_running_s"],
+            "total_inhibited_s": seg["total_inhibited_s"],
+            "final_runtime_s": float(df["RunTime"].iloc[-1]),
+            "final_inhibittime_s": float(df["InhibitTime"].iloc[-1]),
+        })
+
+    if save_path:
+        fig.savefig(save_path, dpi=dpi)
+        print(f"Saved stacked timeline to: {save_path}")
+    if show:
+        plt.show()
+
+    summary_df = pd.DataFrame(summaries).sort_values("Sample").reset_index(drop=True)
+    return summary_df, fig
+
+
+def plot_directory_timelines_fast(
+    data_dir: str,
+    abs_tol: float = 1e-6,
+    save_path: Optional[str] = None,
+    max_files: Optional[int] = None,
+    show: bool = True,
+) -> pd.DataFrame:
+    """Drop-in for ``plot_directory_timelines_time_inhibit_first`` (same summary)."""
+    from adc_parser import extract_adc_headers, load_adc_data
+
+    records = []
+    for hdr in sorted(Path(data_dir).rglob("*.hdr")):
+        adc = hdr.with_suffix(".adc")
+        if not adc.exists():
+            continue
+        try:
+            df = load_adc_data(adc, extract_adc_headers(hdr))
+            df["RunTime"] = pd.to_numeric(df["RunTime"], errors="coerce")
+            df["InhibitTime"] = pd.to_numeric(df["InhibitTime"], errors="coerce")
+            df = df.dropna(subset=["RunTime", "InhibitTime"]).sort_values("RunTime").reset_index(drop=True)
+            if len(df) >= 2:
+                records.append((hdr.stem, df))
+        except Exception as e:
+            print(f"Skipping {hdr.stem}: {e}")
+        if max_files and len(records) >= max_files:
+            break
+
+    if not records:
+        print("No valid ADC/HDR pairs found.")
+        return pd.DataFrame(columns=[
+            "Sample", "total_elapsed_s", "total_running_s", "total_inhibited_s",
+            "final_runtime_s", "final_inhibittime_s",
+        ])
+    summary_df, fig = plot_timeline_records(records, abs_tol=abs_tol, save_path=save_path, show=show)
+    if not show:
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+    return summary_df
@@ -0,0 +1,384 @@
+"""Mergeable binned-CDF sketches and all-pairs distance matrices.
+
+Settling-bias checks need RunTime (or size) distributions compared across
+every pair of taxonomic groups, datasets or bins, not just the two
+directories in ``plot_two_dirs``. Pairwise raw-data tests do not scale to
+thousands of groups, so each group is reduced once to a histogram on a fixed
+grid and every later comparison works on those counts.
+
+Design goals:
+- A ``SketchGrid`` fixes the bin edges; counts below the first / above the
+  last edge go to underflow / overflow cells, so no value is dropped from
+  the counts, CDFs or KS distances. Their positions are lost, though, so
+  ``wasserstein_matrix`` refuses tail mass unless told to treat it as
+  sitting on the nearest edge (a lower bound).
+- Sketches on the same grid merge by adding counts: per-bin sketches can be
+  combined into per-day, per-dataset or per-group sketches without
+  re-reading rows (``merge`` and ``regroup``).
+- ``ks_matrix`` and ``wasserstein_matrix`` compare all groups at once with
+  broadcasting over row blocks (bounded by ``max_cells``) and only compute
+  the upper triangle.
+- KS is evaluated at the grid edges, so it is a lower bound on the exact KS
+  statistic with resolution set by the grid; Wasserstein assumes values are
+  uniform within each cell and integrates the piecewise-linear CDF
+  difference exactly.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Sequence
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from runtime_resampling import quantile_label
+
+
+# Float64 values per distance block; Wasserstein needs a few temporaries of this size
+DEFAULT_MAX_CELLS = 4_000_000
+
+
+class SketchGrid:
+    """Fixed bin edges shared by every sketch that will be merged or compared."""
+
+    def __init__(self, edges):
+        edges = np.asarray(edges, dtype=float)
+        if edges.ndim != 1 or len(edges) < 2 or np.any(np.diff(edges) <= 0):
+            raise ValueError("edges must be a strictly increasing 1-D array with at least two values")
+        self.edges = edges
+
+    @classmethod
+    def linear(cls, lo: float, hi: float, n_bins: int) -> "SketchGrid":
+        return cls(np.linspace(lo, hi, n_bins + 1))
+
+    @classmethod
+    def log(cls, lo: float, hi: float, n_bins: int) -> "SketchGrid":
+        return cls(np.geomspace(lo, hi, n_bins + 1))
+
+    @property
+    def n_cells(self) -> int:
+        """Interior bins plus the underflow and overflow cells."""
+        return len(self.edges) + 1
+
+    def cells(self, values: np.ndarray) -> np.ndarray:
+        """Cell index per value: 0 below ``edges[0]``, ``len(edges)`` at or above ``edges[-1]``."""
+        return np.searchsorted(self.edges, values, side="right")
+
+    def same_as(self, other: "SketchGrid") -> bool:
+        return self.edges.shape == other.edges.shape and np.array_equal(self.edges, other.edges)
+
+
+def runtime_grid(max_s: float = 1500.0, n_bins: int = 750) -> SketchGrid:
+    """RunTime in seconds, 2 s cells by default (longer than any IFCB sample)."""
+    return SketchGrid.linear(0.0, max_s, n_bins)
+
+
+def size_grid(lo: float = 1.0, hi: float = 1000.0, n_bins: int = 300) -> SketchGrid:
+    """Log-spaced size grid, e.g. ESD in microns."""
+    return SketchGrid.log(lo, hi, n_bins)
+
+
+class SketchSet:
+    """One histogram row per named group, all on the same grid."""
+
+    def __init__(self, grid: SketchGrid, names: Sequence[str], counts: np.ndarray):
+        counts = np.asarray(counts, dtype=np.int64).reshape(len(names), grid.n_cells)
+        if len(set(names)) != len(names):
+            raise ValueError("sketch names must be unique")
+        self.grid = grid
+        self.names = list(names)
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"SketchSet({len(self)} groups, {len(self.grid.edges) - 1} bins, {int(self.counts.sum()):,} values)"
+
+    # ---- construction -----------------------------------------------------
+
+    @classmethod
+    def from_values(cls, grid: SketchGrid, groups: Dict[str, np.ndarray]) -> "SketchSet":
+        counts = np.zeros((len(groups), grid.n_cells), dtype=np.int64)
+        for i, values in enumerate(groups.values()):
+            v = np.asarray(values, dtype=float)
+            v = v[np.isfinite(v)]
+            counts[i] = np.bincount(grid.cells(v), minlength=grid.n_cells)
+        return cls(grid, [str(k) for k in groups], counts)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        value_col: str,
+        grid: SketchGrid,
+        group_cols: Optional[str | Sequence[str]] = None,
+        name: str = "all",
+    ) -> "SketchSet":
+        """Sketch ``df[value_col]`` per group (one bincount for all groups).
+
+        Multiple ``group_cols`` are joined into names like ``"<a>/<b>"``;
+        rows with a missing group are skipped. Without ``group_cols`` the
+        whole frame becomes one sketch called ``name``.
+        """
+        values = pd.to_numeric(df[value_col], errors="coerce").to_numpy(dtype=float)
+        if group_cols is None:
+            codes, names = np.zeros(len(df), dtype=np.int64), [name]
+        else:
+            cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+            parts = df[cols].astype("string")
+            keys = parts[cols[0]]
+            for col in cols[1:]:
+                keys = keys + "/" + parts[col]  # NA in any part keeps the key NA
+            codes, uniques = pd.factorize(keys, sort=True)
+            names = [str(u) for u in uniques]
+
+        ok = np.isfinite(values) & (codes >= 0)
+        flat = codes[ok].astype(np.int64) * grid.n_cells + grid.cells(values[ok])
+        counts = np.bincount(flat, minlength=len(names) * grid.n_cells)
+        return cls(grid, names, counts.reshape(len(names), grid.n_cells))
+
+    # ---- merging ----------------------------------------------------------
+
+    def merge(self, other: "SketchSet") -> "SketchSet":
+        """Union of groups; counts are added where names match."""
+        if not self.grid.same_as(other.grid):
+            raise ValueError("cannot merge sketches built on different grids")
+        index = {n: i for i, n in enumerate(self.names)}
+        names = self.names + [n for n in other.names if n not in index]
+        index.update({n: i for i, n in enumerate(names)})
+        counts = np.zeros((len(names), self.grid.n_cells), dtype=np.int64)
+        counts[:len(self)] = self.counts
+        np.add.at(counts, [index[n] for n in other.names], other.counts)
+        return SketchSet(self.grid, names, counts)
+
+    def regroup(self, key: Dict[str, str] | Callable[[str], Optional[str]]) -> "SketchSet":
+        """Combine rows under new names (e.g. bin pid -> day or dataset).
+
+        ``key`` maps each current name to its new name; names mapped to None
+        (or missing from a dict) are dropped.
+        """
+        lookup = key.get if isinstance(key, dict) else key
+        new = [lookup(n) for n in self.names]
+        keep = np.array([k is not None for k in new], dtype=bool)
+        codes, uniques = pd.factorize(pd.Series([k for k in new if k is not None], dtype=object), sort=True)
+        counts = np.zeros((len(uniques), self.grid.n_cells), dtype=np.int64)
+        np.add.at(counts, codes, self.counts[keep])
+        return SketchSet(self.grid, [str(u) for u in uniques], counts)
+
+    def subset(self, names: Iterable[str]) -> "SketchSet":
+        index = {n: i for i, n in enumerate(self.names)}
+        names = list(names)
+        return SketchSet(self.grid, names, self.counts[[index[n] for n in names]])
+
+    # ---- summaries --------------------------------------------------------
+
+    @property
+    def totals(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+    def cdf(self) -> np.ndarray:
+        """Fraction of each group below every edge, shape ``(groups, len(edges))``.
+
+        Empty groups are all-NaN.
+        """
+        cum = np.cumsum(self.counts, axis=1)[:, :-1].astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return cum / self.totals[:, None]
+
+    def quantiles(self, qs: Sequence[float] = (0.1, 0.5, 0.9)) -> pd.DataFrame:
+        """Approximate quantiles, interpolating linearly within a cell."""
+        F = self.cdf()
+        edges = self.grid.edges
+        out = {}
+        for q in qs:
+            # First edge whose CDF reaches q; the quantile lies in the cell before it
+            hi = np.clip((F < q).sum(axis=1), 1, len(edges) - 1)
+            rows = np.arange(len(self))
+            f0, f1 = F[rows, hi - 1], F[rows, hi]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                frac = np.where(f1 > f0, (q - f0) / (f1 - f0), 0.0)
+            out[f"q{quantile_label(q)}"] = edges[hi - 1] + np.clip(frac, 0.0, 1.0) * (edges[hi] - edges[hi - 1])
+        return pd.DataFrame({"name": self.names, "n": self.totals, **out})
+
+    # ---- distances --------------------------------------------------------
+
+    def ks_matrix(self, max_cells: int = DEFAULT_MAX_CELLS) -> pd.DataFrame:
+        """All-pairs KS distance ``max |F_i - F_j|`` over the grid edges."""
+        return self._pairwise(lambda d, widths: np.abs(d).max(axis=-1), max_cells)
+
+    def tail_counts(self) -> pd.DataFrame:
+        """Values below the first edge / at or above the last edge, per group."""
+        return pd.DataFrame({"name": self.names, "underflow": self.counts[:, 0], "overflow": self.counts[:, -1]})
+
+    def wasserstein_matrix(self, max_cells: int = DEFAULT_MAX_CELLS, allow_tails: bool = False) -> pd.DataFrame:
+        """All-pairs 1-Wasserstein distance, in the units of the sketched value.
+
+        Values in the underflow/overflow cells have no known position, so the
+        distance is only exact when those cells are empty; otherwise this
+        raises ``ValueError``. With ``allow_tails=True`` tail values are
+        treated as sitting on the nearest edge and the result is a lower bound
+        (widen the grid to make it exact).
+        """
+        if not allow_tails:
+            tails = self.counts[:, 0] + self.counts[:, -1]
+            if tails.any():
+                worst = self.names[int(np.argmax(tails))]
+                raise ValueError(
+                    f"{int((tails > 0).sum())} group(s) have values outside the grid "
+                    f"(most in {worst!r}: {int(tails.max())}); widen the grid or pass allow_tails=True"
+                )
+        return self._pairwise(_integrated_abs, max_cells)
+
+    def distance_matrix(
+        self,
+        metric: str = "ks",
+        max_cells: int = DEFAULT_MAX_CELLS,
+        allow_tails: bool = False,
+    ) -> pd.DataFrame:
+        if metric == "ks":
+            return self.ks_matrix(max_cells)
+        if metric == "wasserstein":
+            return self.wasserstein_matrix(max_cells, allow_tails)
+        raise ValueError(f"metric must be 'ks' or 'wasserstein', not {metric!r}")
+
+    def _pairwise(self, reduce, max_cells: int) -> pd.DataFrame:
+        F = self.cdf()
+        widths = np.diff(self.grid.edges)
+        n, width = F.shape
+        out = np.zeros((n, n))
+        block = max(1, int(max_cells) // max(1, n * width))
+        for i0 in range(0, n, block):
+            i1 = min(i0 + block, n)
+            # Only columns j >= i0 are needed; the lower triangle is mirrored below
+            d = F[i0:i1, None, :] - F[None, i0:, :]
+            out[i0:i1, i0:] = reduce(d, widths)
+        out = np.triu(out) + np.triu(out, 1).T
+        return pd.DataFrame(out, index=self.names, columns=self.names)
+
+    # ---- persistence ------------------------------------------------------
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long table of ``name, cell, lower, upper, count`` for non-empty cells."""
+        rows, cells = np.nonzero(self.counts)
+        bounds = np.r_[-np.inf, self.grid.edges, np.inf]
+        return pd.DataFrame({
+            "name": np.asarray(self.names, dtype=object)[rows],
+            "cell": cells,
+            "lower": bounds[cells],
+            "upper": bounds[cells + 1],
+            "count": self.counts[rows, cells],
+        })
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, edges=self.grid.edges, names=np.asarray(self.names, dtype=str), counts=self.counts)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SketchSet":
+        with np.load(path) as z:
+            return cls(SketchGrid(z["edges"]), [str(n) for n in z["names"]], z["counts"])
+
+
+def _integrated_abs(d: np.ndarray, widths: np.ndarray) -> np.ndarray:
+    """Integral of ``|d(x)|`` with ``d`` linear between consecutive edges.
+
+    Trapezoids of ``|d|`` are exact where ``d`` keeps its sign over a cell;
+    cells where it crosses zero lose ``|a||b| / (|a| + |b|)`` of their width.
+    """
+    abs_d = np.abs(d)
+    trapezoid = np.r_[widths, 0.0] / 2 + np.r_[0.0, widths] / 2
+    area = abs_d @ trapezoid
+    a, b = d[..., :-1], d[..., 1:]
+    crosses = np.nonzero(a * b < 0)
+    if len(crosses[0]):
+        abs_a, abs_b = abs_d[..., :-1][crosses], abs_d[..., 1:][crosses]
+        loss = abs_a * abs_b / (abs_a + abs_b) * widths[crosses[-1]]
+        np.subtract.at(area, crosses[:-1], loss)
+    return area
+
+
+def pairs_frame(matrix: pd.DataFrame, metric: str = "distance") -> pd.DataFrame:
+    """Upper-triangle pairs of a distance matrix as ``group_a, group_b, <metric>``."""
+    i, j = np.triu_indices(len(matrix), k=1)
+    names = np.asarray(matrix.index, dtype=object)
+    return pd.DataFrame({
+        "group_a": names[i],
+        "group_b": names[j],
+        metric: matrix.to_numpy()[i, j],
+    }).sort_values(metric, ascending=False, ignore_index=True)
+
+
+def _sketch_file(job) -> SketchSet:
+    path, value_col, grid, group_cols = job
+    columns = [value_col] + ([] if group_cols is None else [group_cols] if isinstance(group_cols, str) else list(group_cols))
+    df = pd.read_csv(path, usecols=columns)
+    return SketchSet.from_frame(df, value_col, grid, group_cols, name=Path(path).stem)
+
+
+def sketch_files(
+    paths: Iterable[str | Path],
+    value_col: str = "RunTime",
+    grid: Optional[SketchGrid] = None,
+    group_cols: Optional[str | Sequence[str]] = None,
+    max_workers: Optional[int] = None,
+) -> SketchSet:
+    """Sketch many CSVs and merge the results.
+
+    Without ``group_cols`` each file becomes one sketch named by its stem;
+    with them, groups are merged across files by name. ``max_workers=1``
+    runs in-process.
+    """
+    grid = grid or runtime_grid()
+    jobs = [(Path(p), value_col, grid, group_cols) for p in paths]
+    if max_workers == 1:
+        parts = [_sketch_file(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            parts = list(pool.map(_sketch_file, jobs, chunksize=8))
+
+    result = SketchSet(grid, [], np.zeros((0, grid.n_cells), dtype=np.int64))
+    for part in parts:
+        result = result.merge(part)
+    return result
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Build binned-CDF sketches and all-pairs distance matrices")
+    parser.add_argument("directory", type=str, help="Directory of CSVs (merged bins, master tables, ...)")
+    parser.add_argument("--pattern", type=str, default="*.csv")
+    parser.add_argument("--value-col", type=str, default="RunTime")
+    parser.add_argument("--group-col", type=str, nargs="*", default=None, help="Group columns (default: one sketch per file)")
+    parser.add_argument("--grid", choices=["runtime", "size"], default="runtime")
+    parser.add_argument("--bins", type=int, default=None, help="Number of grid bins")
+    parser.add_argument("--metric", choices=["ks", "wasserstein"], default="ks")
+    parser.add_argument("--allow-tails", action="store_true",
+                        help="Wasserstein: place values outside the grid on the nearest edge (lower bound)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sketches", type=str, default=None, help="Save the merged sketches to this .npz")
+    parser.add_argument("--output", type=str, default=None, help="CSV path for the distance matrix")
+    args = parser.parse_args()
+
+    make_grid = runtime_grid if args.grid == "runtime" else size_grid
+    grid = make_grid(n_bins=args.bins) if args.bins else make_grid()
+    paths = sorted(Path(args.directory).rglob(args.pattern))
+    sketches = sketch_files(paths, args.value_col, grid, args.group_col or None, max_workers=args.workers)
+    print(sketches)
+    if args.sketches:
+        sketches.save(args.sketches)
+
+    matrix = sketches.distance_matrix(args.metric, allow_tails=args.allow_tails)
+    if args.output:
+        matrix.to_csv(args.output)
+        print(f"Wrote {len(matrix):,} x {len(matrix):,} {args.metric} matrix to {args.output}")
+    else:
+        print(pairs_frame(matrix, args.metric).head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    _cli()
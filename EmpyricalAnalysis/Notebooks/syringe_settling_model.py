@@ -38,3 +38,48 @@ def distance_over_time(v_term, times, start_depth, bottom_depth):
     distances = v_term * np.array(times)
     max_distance = max(0.0, bottom_depth - start_depth)
     return np.clip(distances, 0.0, max_distance)
+
+
+# Array versions: same physics as above, for NumPy arrays of d and rho_p
+# (rho_f and mu may also be arrays; everything is broadcast together).
+
+def reynolds_number_array(v, d, rho_f, mu):
+    v = np.asarray(v, dtype=float)
+    return np.where(v > 0.0, rho_f * v * d / mu, 0.0)
+
+def cd_schiller_naumann_array(Re):
+    Re = np.asarray(Re, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cd = np.where(Re < 1000.0, 24.0/Re * (1.0 + 0.15 * np.abs(Re)**0.687), 0.44)
+    return np.where(Re <= 0, 1e9, cd)
+
+def terminal_velocity_iterative_array(d, rho_p, rho_f, mu, tol=1e-9, max_iter=200):
+    d, rho_p, rho_f, mu = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (d, rho_p, rho_f, mu)))
+    v = np.maximum(stokes_velocity(d, rho_p, rho_f, mu), 1e-12)
+    # Only elements that have not converged are updated each pass
+    active = np.flatnonzero(np.ones(v.shape, dtype=bool))
+    v_flat = v.reshape(-1)
+    d_f, rp_f, rf_f, mu_f = (x.reshape(-1) for x in (d, rho_p, rho_f, mu))
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        Re = reynolds_number_array(v_flat[active], d_f[active], rf_f[active], mu_f[active])
+        Cd = cd_schiller_naumann_array(Re)
+        v_new = np.sqrt((4.0/3.0) * ((rp_f[active] - rf_f[active]) * g * d_f[active]) / (rf_f[active] * Cd))
+        done = np.abs(v_new - v_flat[active]) <= tol * np.maximum(1.0, v_new)
+        v_flat[active] = v_new
+        active = active[~done]
+    return v_flat.reshape(v.shape)
+
+def terminal_velocity_array(d, rho_p, rho_f, mu, re_threshold=0.5, tol=1e-9, max_iter=200):
+    """Vectorized ``terminal_velocity``: Stokes where Re <= re_threshold,
+    Schiller-Naumann fixed point elsewhere. Returns an array shaped like the
+    broadcast inputs."""
+    d, rho_p, rho_f, mu = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (d, rho_p, rho_f, mu)))
+    v = stokes_velocity(d, rho_p, rho_f, mu)
+    Re_stokes = reynolds_number_array(v, d, rho_f, mu)
+    drag = Re_stokes > re_threshold
+    if np.any(drag):
+        v = np.array(v, dtype=float)
+        v[drag] = terminal_velocity_iterative_array(d[drag], rho_p[drag], rho_f[drag], mu[drag], tol, max_iter)
+    return v
@@ -0,0 +1,267 @@
+"""Precomputed terminal-velocity lookup tables for fixed fluid properties.
+
+Within one simulation or fitting run rho_f and mu are fixed, so terminal
+velocity only depends on diameter and excess density (rho_p - rho_f). This
+module reproduces ``terminal_velocity`` from syringe_settling_model with a
+table built once per fluid configuration.
+
+Design goals:
+- The Stokes branch (Re <= re_threshold) is evaluated analytically; only the
+  Schiller-Naumann branch is tabulated. ``terminal_velocity`` jumps where the
+  two branches meet, and a single table would smear that jump.
+- The drag branch is smooth in log-log space and is interpolated bilinearly on
+  a log-spaced diameter x excess-density grid; the interpolation error is
+  measured at build time (``max_rel_error``).
+- Drag-branch queries outside the grid fall back to the exact solver, so
+  results are never extrapolated.
+- Tables are cached in memory (LRU over fluid configurations) and optionally
+  on disk as .npz files keyed by the fluid and grid parameters.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+import argparse
+import hashlib
+import json
+
+import numpy as np
+
+from syringe_settling_model import (
+    g,
+    reynolds_number_array,
+    stokes_velocity,
+    terminal_velocity_array,
+    terminal_velocity_iterative_array,
+)
+
+
+TABLE_VERSION = 1
+
+DEFAULT_D_RANGE_M = (1e-7, 1e-2)
+DEFAULT_DRHO_RANGE = (1e-2, 1e4)
+
+
+@dataclass
+class VelocityTable:
+    """Schiller-Naumann terminal velocity on a log-spaced (diameter, excess density) grid."""
+
+    rho_f: float
+    mu: float
+    re_threshold: float
+    log_d: np.ndarray        # log10 diameter (m), uniform spacing
+    log_drho: np.ndarray     # log10 excess density (kg/m^3), uniform spacing
+    log_v: np.ndarray        # log10 drag-branch velocity (m/s), shape (len(log_d), len(log_drho))
+    max_rel_error: float = np.nan
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.log_v.shape
+
+    def exact(self, d, rho_p) -> np.ndarray:
+        return terminal_velocity_array(d, rho_p, self.rho_f, self.mu, self.re_threshold)
+
+    def _interp(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Bilinear interpolation of log_v at in-range log coordinates."""
+        dx = self.log_d[1] - self.log_d[0]
+        dy = self.log_drho[1] - self.log_drho[0]
+        fx = (x - self.log_d[0]) / dx
+        fy = (y - self.log_drho[0]) / dy
+        i = np.clip(fx.astype(np.int64), 0, len(self.log_d) - 2)
+        j = np.clip(fy.astype(np.int64), 0, len(self.log_drho) - 2)
+        tx = fx - i
+        ty = fy - j
+        z = self.log_v
+        return (
+            z[i, j] * (1 - tx) * (1 - ty)
+            + z[i + 1, j] * tx * (1 - ty)
+            + z[i, j + 1] * (1 - tx) * ty
+            + z[i + 1, j + 1] * tx * ty
+        )
+
+    def __call__(self, d, rho_p) -> np.ndarray:
+        """Terminal velocity (m/s) for arrays of diameter (m) and particle density."""
+        d, rho_p = np.broadcast_arrays(np.asarray(d, dtype=float), np.asarray(rho_p, dtype=float))
+        drho = rho_p - self.rho_f
+        out = np.array(stokes_velocity(d, rho_p, self.rho_f, self.mu), dtype=float)
+        drag = reynolds_number_array(out, d, self.rho_f, self.mu) > self.re_threshold
+        if not np.any(drag):
+            return out
+
+        x = np.log10(d[drag])
+        y = np.log10(drho[drag])
+        inside = (
+            (x >= self.log_d[0]) & (x <= self.log_d[-1])
+            & (y >= self.log_drho[0]) & (y <= self.log_drho[-1])
+        )
+        v_drag = np.empty(x.shape, dtype=float)
+        v_drag[inside] = 10.0 ** self._interp(x[inside], y[inside])
+        if not np.all(inside):
+            outside = ~inside
+            v_drag[outside] = self.exact(d[drag][outside], rho_p[drag][outside])
+        out[drag] = v_drag
+        return out
+
+    def measure_error(self) -> float:
+        """Max relative error of the drag-branch table at cell centres, where
+        bilinear error peaks."""
+        xc = 0.5 * (self.log_d[:-1] + self.log_d[1:])
+        yc = 0.5 * (self.log_drho[:-1] + self.log_drho[1:])
+        X, Y = np.meshgrid(xc, yc, indexing="ij")
+        exact = terminal_velocity_iterative_array(10.0 ** X, self.rho_f + 10.0 ** Y, self.rho_f, self.mu)
+        approx = 10.0 ** self._interp(X, Y)
+        self.max_rel_error = float(np.max(np.abs(approx - exact) / exact))
+        return self.max_rel_error
+
+
+def build_velocity_table(
+    rho_f: float,
+    mu: float,
+    *,
+    re_threshold: float = 0.5,
+    d_range_m: Tuple[float, float] = DEFAULT_D_RANGE_M,
+    drho_range: Tuple[float, float] = DEFAULT_DRHO_RANGE,
+    n_d: int = 512,
+    n_drho: int = 256,
+) -> VelocityTable:
+    """Tabulate the Schiller-Naumann branch and measure the interpolation error."""
+    log_d = np.linspace(np.log10(d_range_m[0]), np.log10(d_range_m[1]), n_d)
+    log_drho = np.linspace(np.log10(drho_range[0]), np.log10(drho_range[1]), n_drho)
+    D, DR = np.meshgrid(10.0 ** log_d, 10.0 ** log_drho, indexing="ij")
+    v = terminal_velocity_iterative_array(D, rho_f + DR, rho_f, mu)
+    table = VelocityTable(
+        rho_f=float(rho_f),
+        mu=float(mu),
+        re_threshold=float(re_threshold),
+        log_d=log_d,
+        log_drho=log_drho,
+        log_v=np.log10(v),
+    )
+    table.measure_error()
+    return table
+
+
+def _table_key(rho_f, mu, re_threshold, d_range_m, drho_range, n_d, n_drho) -> str:
+    payload = json.dumps(
+        [TABLE_VERSION, g, float(rho_f), float(mu), float(re_threshold),
+         list(map(float, d_range_m)), list(map(float, drho_range)), int(n_d), int(n_drho)]
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def save_table(table: VelocityTable, path: str | Path) -> None:
+    np.savez(
+        path,
+        rho_f=table.rho_f,
+        mu=table.mu,
+        re_threshold=table.re_threshold,
+        log_d=table.log_d,
+        log_drho=table.log_drho,
+        log_v=table.log_v,
+        max_rel_error=table.max_rel_error,
+    )
+
+
+def load_table(path: str | Path) -> VelocityTable:
+    with np.load(path) as z:
+        return VelocityTable(
+            rho_f=float(z["rho_f"]),
+            mu=float(z["mu"]),
+            re_threshold=float(z["re_threshold"]),
+            log_d=z["log_d"],
+            log_drho=z["log_drho"],
+            log_v=z["log_v"],
+            max_rel_error=float(z["max_rel_error"]),
+        )
+
+
+class VelocityTableCache:
+    """In-memory LRU of tables per fluid configuration, backed by an optional disk cache.
+
+    Parameters
+    ----------
+    cache_dir:
+        Folder for .npz tables; ``None`` keeps tables in memory only.
+    maxsize:
+        Number of fluid configurations kept in memory; the least recently used
+        table is evicted first.
+    """
+
+    def __init__(self, cache_dir: Optional[str | Path] = None, maxsize: int = 8):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.maxsize = maxsize
+        self._tables: "OrderedDict[str, VelocityTable]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def get(
+        self,
+        rho_f: float,
+        mu: float,
+        *,
+        re_threshold: float = 0.5,
+        d_range_m: Tuple[float, float] = DEFAULT_D_RANGE_M,
+        drho_range: Tuple[float, float] = DEFAULT_DRHO_RANGE,
+        n_d: int = 512,
+        n_drho: int = 256,
+    ) -> VelocityTable:
+        key = _table_key(rho_f, mu, re_threshold, d_range_m, drho_range, n_d, n_drho)
+        if key in self._tables:
+            self._tables.move_to_end(key)
+            return self._tables[key]
+
+        path = self.cache_dir / f"vt_{key}.npz" if self.cache_dir is not None else None
+        if path is not None and path.exists():
+            table = load_table(path)
+        else:
+            table = build_velocity_table(
+                rho_f, mu, re_threshold=re_threshold, d_range_m=d_range_m,
+                drho_range=drho_range, n_d=n_d, n_drho=n_drho,
+            )
+            if path is not None:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                save_table(table, path)
+
+        self._tables[key] = table
+        while len(self._tables) > self.maxsize:
+            self._tables.popitem(last=False)
+        return table
+
+    def clear(self) -> None:
+        self._tables.clear()
+
+
+_default_cache = VelocityTableCache()
+
+
+def get_velocity_table(rho_f: float, mu: float, **kwargs) -> VelocityTable:
+    """Table for (rho_f, mu) from the module-level in-memory cache."""
+    return _default_cache.get(rho_f, mu, **kwargs)
+
+
+def terminal_velocity_lookup(d, rho_p, rho_f: float, mu: float, **kwargs) -> np.ndarray:
+    """Drop-in for ``terminal_velocity_array`` with scalar rho_f and mu."""
+    return get_velocity_table(rho_f, mu, **kwargs)(d, rho_p)
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Build (or load) a cached terminal-velocity table")
+    parser.add_argument("--rho-f", type=float, default=1025.0, help="Fluid density kg/m^3 (default: 1025)")
+    parser.add_argument("--mu", type=float, default=1.05e-3, help="Dynamic viscosity Pa*s (default: 1.05e-3)")
+    parser.add_argument("--n-d", type=int, default=512)
+    parser.add_argument("--n-drho", type=int, default=256)
+    parser.add_argument("--cache-dir", type=str, default=None)
+    args = parser.parse_args()
+
+    cache = VelocityTableCache(args.cache_dir)
+    table = cache.get(args.rho_f, args.mu, n_d=args.n_d, n_drho=args.n_drho)
+    print(f"Table {table.shape} for rho_f={table.rho_f}, mu={table.mu}: "
+          f"max relative interpolation error {table.max_rel_error:.2e}")
+
+
+if __name__ == "__main__":
+    _cli()
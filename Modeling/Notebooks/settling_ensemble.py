@@ -0,0 +1,310 @@
+"""Parallel Monte Carlo ensembles of syringe settling + IFCB inhibit sampling.
+
+``simulate_particle_settling`` (SettlingDistributionModel) runs one seed and
+one parameter set per notebook cell. This module sweeps a grid of parameters
+and replicates in a process pool and streams one summary row per replicate
+to a CSV, so confidence bands over thousands of replicates are practical.
+
+Design goals:
+- Particles are drawn directly as NumPy arrays (no DataFrame sampling).
+- Each replicate gets its own ``np.random.SeedSequence`` child stream spawned
+  from one root seed, so results do not depend on worker count or scheduling.
+- Only per-replicate summaries (arrival quantiles, sampled fraction per class)
+  leave the workers; rows are appended to disk as they finish.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+import csv
+
+import numpy as np
+import pandas as pd
+
+from dead_time_sampling import dead_time_mask
+
+
+G = 9.81
+
+# Defaults from simulate_particle_settling in SettlingDistributionModel
+DEFAULT_PARAMS: Dict[str, object] = {
+    "syringe_height_m": 0.110998,
+    "syringe_volume_ml": 5.0,
+    "flow_rate_ml_s": 1.0 / 240.0,   # gives the notebook's 0.00009249833333 m/s
+    "fluid_density": 1025.0,
+    "fluid_viscosity": 1.05e-3,
+    "inhibit_time": 0.08,
+    "n_particles": 1000,
+    "mixture": "default",
+    "run_duration_s": None,
+}
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+CLASS_COLUMNS = (
+    "size_class",
+    "mean_diameter_m",
+    "sd_diameter_m",
+    "mean_density_kg_m3",
+    "sd_density_kg_m3",
+    "fraction",
+)
+
+
+@dataclass(frozen=True)
+class ClassArrays:
+    """A ``particle_classes`` table as plain arrays, cheap to ship to workers."""
+
+    names: tuple
+    mean_diameter_m: np.ndarray
+    sd_diameter_m: np.ndarray
+    mean_density_kg_m3: np.ndarray
+    sd_density_kg_m3: np.ndarray
+    fraction: np.ndarray
+
+    @classmethod
+    def from_frame(cls, particle_classes: pd.DataFrame) -> "ClassArrays":
+        missing = set(CLASS_COLUMNS) - set(particle_classes.columns)
+        if missing:
+            raise ValueError(f"particle_classes is missing columns: {sorted(missing)}")
+        frac = particle_classes["fraction"].to_numpy(dtype=float)
+        return cls(
+            names=tuple(particle_classes["size_class"].astype(str)),
+            mean_diameter_m=particle_classes["mean_diameter_m"].to_numpy(dtype=float),
+            sd_diameter_m=particle_classes["sd_diameter_m"].to_numpy(dtype=float),
+            mean_density_kg_m3=particle_classes["mean_density_kg_m3"].to_numpy(dtype=float),
+            sd_density_kg_m3=particle_classes["sd_density_kg_m3"].to_numpy(dtype=float),
+            fraction=frac / frac.sum(),
+        )
+
+
+def background_velocity(syringe_height_m: float, syringe_volume_ml: float, flow_rate_ml_s: float) -> float:
+    """Downward fluid velocity (m/s) from flow rate and syringe geometry."""
+    area_m2 = syringe_volume_ml * 1e-6 / syringe_height_m
+    return flow_rate_ml_s * 1e-6 / area_m2
+
+
+def sample_particles(
+    rng: np.random.Generator,
+    classes: ClassArrays,
+    n_particles: int,
+    syringe_height_m: float,
+    fluid_density: float,
+) -> Dict[str, np.ndarray]:
+    """Draw class, start height, diameter and density arrays for one replicate."""
+    class_idx = rng.choice(len(classes.names), size=n_particles, p=classes.fraction)
+    initial_position_m = rng.uniform(0, syringe_height_m, n_particles)
+    diameter_m = rng.normal(classes.mean_diameter_m[class_idx], classes.sd_diameter_m[class_idx])
+    density = rng.normal(classes.mean_density_kg_m3[class_idx], classes.sd_density_kg_m3[class_idx])
+
+    # Prevent impossible values (same clipping as the notebook)
+    np.maximum(diameter_m, 1e-6, out=diameter_m)
+    np.maximum(density, fluid_density + 1, out=density)
+
+    return {
+        "class_idx": class_idx,
+        "initial_position_m": initial_position_m,
+        "diameter_m": diameter_m,
+        "density_kg_m3": density,
+    }
+
+
+def arrival_times(
+    particles: Mapping[str, np.ndarray],
+    fluid_density: float,
+    fluid_viscosity: float,
+    background_velocity_m_s: float,
+) -> np.ndarray:
+    """Time to bottom (s) under Stokes settling plus background flow; inf if never."""
+    radius_m = particles["diameter_m"] / 2
+    settling = (2 / 9) * (particles["density_kg_m3"] - fluid_density) * G * radius_m**2 / fluid_viscosity
+    net = settling + background_velocity_m_s
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(net > 0, particles["initial_position_m"] / net, np.inf)
+
+
+def build_grid(sweep: Mapping[str, Sequence[object]]) -> List[Dict[str, object]]:
+    """Cartesian product of ``sweep`` values over ``DEFAULT_PARAMS``."""
+    unknown = set(sweep) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    keys = list(sweep)
+    grid = []
+    for values in product(*(sweep[k] for k in keys)):
+        params = dict(DEFAULT_PARAMS)
+        params.update(zip(keys, values))
+        grid.append(params)
+    return grid
+
+
+def _quantile_label(q: float) -> str:
+    """Percent label for a quantile: 0.05 -> "05", 0.5 -> "50", 0.995 -> "99_5"."""
+    pct = round(q * 100, 6)
+    if pct == round(pct):
+        return f"{round(pct):02d}"
+    whole, frac = f"{pct:.6f}".rstrip("0").split(".")
+    return f"{int(whole):02d}_{frac}"
+
+
+def run_replicate(
+    params: Mapping[str, object],
+    classes: ClassArrays,
+    seed: np.random.SeedSequence,
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+) -> Dict[str, object]:
+    """Simulate one replicate and reduce it to a flat summary row."""
+    rng = np.random.default_rng(seed)
+    h = float(params["syringe_height_m"])
+    rho_f = float(params["fluid_density"])
+
+    particles = sample_particles(rng, classes, int(params["n_particles"]), h, rho_f)
+    v_bg = background_velocity(h, float(params["syringe_volume_ml"]), float(params["flow_rate_ml_s"]))
+    t = arrival_times(particles, rho_f, float(params["fluid_viscosity"]), v_bg)
+
+    run_duration = params.get("run_duration_s")
+    if run_duration is not None:
+        t = np.where(t <= float(run_duration), t, np.inf)
+
+    sampled = dead_time_mask(t, float(params["inhibit_time"]))
+    arrived = np.isfinite(t)
+
+    row: Dict[str, object] = {
+        "n_arrived": int(arrived.sum()),
+        "n_sampled": int(sampled.sum()),
+        "sampled_fraction": float(sampled.sum() / arrived.sum()) if arrived.any() else np.nan,
+    }
+    finite_t = t[arrived]
+    qs = np.quantile(finite_t, quantiles) if finite_t.size else np.full(len(quantiles), np.nan)
+    row.update({f"arrival_q{_quantile_label(q)}": float(v) for q, v in zip(quantiles, qs)})
+
+    arrived_by_class = np.bincount(particles["class_idx"], weights=arrived, minlength=len(classes.names))
+    sampled_by_class = np.bincount(particles["class_idx"], weights=sampled, minlength=len(classes.names))
+    for k, name in enumerate(classes.names):
+        row[f"sampled_fraction_{name}"] = (
+            float(sampled_by_class[k] / arrived_by_class[k]) if arrived_by_class[k] else np.nan
+        )
+        sel = arrived & (particles["class_idx"] == k)
+        row[f"arrival_median_{name}"] = float(np.median(t[sel])) if sel.any() else np.nan
+    return row
+
+
+def _run_task(task) -> Dict[str, object]:
+    config_id, replicate, params, classes, seed, quantiles = task
+    row = {"config_id": config_id, "replicate": replicate}
+    row.update({k: v for k, v in params.items()})
+    row.update(run_replicate(params, classes, seed, quantiles))
+    return row
+
+
+def _iter_tasks(
+    grid: Sequence[Mapping[str, object]],
+    mixtures: Mapping[str, ClassArrays],
+    n_replicates: int,
+    root_seed: Optional[int],
+    quantiles: Sequence[float],
+) -> Iterator[tuple]:
+    children = np.random.SeedSequence(root_seed).spawn(len(grid) * n_replicates)
+    for config_id, params in enumerate(grid):
+        classes = mixtures[str(params["mixture"])]
+        for rep in range(n_replicates):
+            seed = children[config_id * n_replicates + rep]
+            yield (config_id, rep, dict(params), classes, seed, tuple(quantiles))
+
+
+def run_ensemble(
+    particle_classes: pd.DataFrame | Mapping[str, pd.DataFrame],
+    sweep: Optional[Mapping[str, Sequence[object]]] = None,
+    *,
+    n_replicates: int = 100,
+    seed: Optional[int] = None,
+    output_csv: Optional[str | Path] = None,
+    max_workers: Optional[int] = None,
+    chunksize: int = 8,
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+) -> pd.DataFrame:
+    """Run ``n_replicates`` of every parameter combination in ``sweep``.
+
+    Parameters
+    ----------
+    particle_classes:
+        One ``particle_classes`` table (as in SettlingDistributionModel), or a
+        dict of named tables to sweep over via ``sweep={"mixture": [...]}``.
+    sweep:
+        Mapping from any key in ``DEFAULT_PARAMS`` to the values to try.
+    seed:
+        Root seed; the same seed reproduces every replicate exactly.
+    output_csv:
+        If given, one summary row per replicate is appended as it completes.
+    max_workers:
+        Process count; ``max_workers=1`` runs in-process (handy for debugging).
+
+    Returns one row per replicate with its parameters and summary statistics.
+    """
+    if isinstance(particle_classes, pd.DataFrame):
+        tables = {"default": particle_classes}
+    else:
+        tables = dict(particle_classes)
+    mixtures = {name: ClassArrays.from_frame(df) for name, df in tables.items()}
+
+    sweep = dict(sweep or {})
+    if "mixture" not in sweep and "default" not in mixtures:
+        sweep["mixture"] = list(mixtures)
+    grid = build_grid(sweep)
+
+    tasks = _iter_tasks(grid, mixtures, n_replicates, seed, quantiles)
+    if max_workers == 1:
+        results: Iterable[Dict[str, object]] = map(_run_task, tasks)
+        return _collect(results, output_csv)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return _collect(pool.map(_run_task, tasks, chunksize=chunksize), output_csv)
+
+
+def _collect(results: Iterable[Dict[str, object]], output_csv: Optional[str | Path]) -> pd.DataFrame:
+    rows: List[Dict[str, object]] = []
+    writer = None
+    handle = None
+    try:
+        if output_csv is not None:
+            Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+            handle = open(output_csv, "w", newline="")
+        for row in results:
+            rows.append(row)
+            if handle is not None:
+                if writer is None:
+                    writer = csv.DictWriter(handle, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                handle.flush()
+    finally:
+        if handle is not None:
+            handle.close()
+    return pd.DataFrame(rows)
+
+
+def confidence_bands(
+    summary: pd.DataFrame,
+    value_cols: Optional[Sequence[str]] = None,
+    level: float = 0.95,
+) -> pd.DataFrame:
+    """Mean and central ``level`` interval of each statistic across replicates.
+
+    Groups by ``config_id`` plus the swept parameter columns.
+    """
+    param_cols = [c for c in DEFAULT_PARAMS if c in summary.columns]
+    if value_cols is None:
+        skip = set(param_cols) | {"config_id", "replicate"}
+        value_cols = [c for c in summary.columns if c not in skip]
+    lo, hi = (1 - level) / 2, 1 - (1 - level) / 2
+
+    grouped = summary.groupby(["config_id"], sort=True)
+    out = grouped[param_cols].first()
+    for col in value_cols:
+        out[f"{col}_mean"] = grouped[col].mean()
+        out[f"{col}_lo"] = grouped[col].quantile(lo)
+        out[f"{col}_hi"] = grouped[col].quantile(hi)
+    return out.reset_index()
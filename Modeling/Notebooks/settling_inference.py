@@ -0,0 +1,302 @@
+"""Fit per-class size/density distributions to observed RunTime distributions.
+
+The analysis notebooks compare observed ROI ``RunTime`` distributions to
+expectations with one-off ``ks_2samp``/``kstest`` calls. This module inverts
+the SettlingDistributionModel forward model instead: for one taxon in one
+deployment it finds the ``particle_classes`` row (mean/sd diameter, mean/sd
+density) whose simulated time-to-bottom distribution best matches the
+observed RunTime histogram.
+
+Design goals:
+- Batched forward model: a whole population of candidate parameter vectors is
+  simulated in one (candidates x particles) array computation, using common
+  random numbers so the objective is smooth in the parameters.
+- Vectorized objectives on shared bins: multinomial negative log-likelihood,
+  KS distance between binned CDFs, or L2 CDF distance.
+- Cross-entropy search over log-transformed parameters; any parameter can be
+  fixed (e.g. diameter from imaged ESD, since Stokes velocity only constrains
+  excess density x diameter^2).
+- Independent fits (taxa x deployments) run in a process pool; every fit
+  reports wall time and evaluations per second.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence
+import time
+
+import numpy as np
+import pandas as pd
+
+from settling_ensemble import arrival_times
+
+
+PARAM_NAMES = ("mean_diameter_m", "sd_diameter_m", "mean_density_kg_m3", "sd_density_kg_m3")
+
+DEFAULT_INIT = {
+    "mean_diameter_m": 20e-6,
+    "sd_diameter_m": 5e-6,
+    "mean_density_kg_m3": 1100.0,
+    "sd_density_kg_m3": 25.0,
+}
+
+OBJECTIVES = ("nll", "ks", "cdf_l2")
+
+
+@dataclass(frozen=True)
+class ForwardModel:
+    """Fixed settings of the SettlingDistributionModel forward simulation."""
+
+    h: float = 0.110998
+    fluid_density: float = 1025.0
+    fluid_viscosity: float = 1.05e-3
+    background_velocity_m_s: float = 0.00009249833333
+    n_particles: int = 20_000
+    seed: Optional[int] = 0
+
+    def common_draws(self) -> Dict[str, np.ndarray]:
+        """Standard draws shared by every candidate (common random numbers)."""
+        rng = np.random.default_rng(self.seed)
+        return {
+            "u": rng.uniform(0.0, 1.0, self.n_particles),
+            "z_d": rng.standard_normal(self.n_particles),
+            "z_rho": rng.standard_normal(self.n_particles),
+        }
+
+    def arrival_times(self, params: np.ndarray, draws: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Time to bottom for a batch of candidates.
+
+        ``params`` has shape (K, 4) in ``PARAM_NAMES`` order; the result has
+        shape (K, n_particles). Clipping matches ``simulate_particle_settling``;
+        the Stokes arrival itself is ``settling_ensemble.arrival_times``.
+        """
+        mean_d, sd_d, mean_rho, sd_rho = (params[:, k:k + 1] for k in range(4))
+        particles = {
+            "initial_position_m": self.h * draws["u"],
+            "diameter_m": np.maximum(mean_d + sd_d * draws["z_d"], 1e-6),
+            "density_kg_m3": np.maximum(mean_rho + sd_rho * draws["z_rho"], self.fluid_density + 1),
+        }
+        return arrival_times(particles, self.fluid_density, self.fluid_viscosity, self.background_velocity_m_s)
+
+
+def binned_probabilities(t: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Per-candidate bin probabilities conditioned on landing inside ``edges``.
+
+    ``t`` is (K, N); returns (K, n_bins). One flat ``bincount`` for the batch.
+    """
+    k, _ = t.shape
+    n_bins = len(edges) - 1
+    widths = np.diff(edges)
+    if np.allclose(widths, widths[0]):
+        # Equal-width bins: direct index arithmetic instead of a binary search
+        with np.errstate(invalid="ignore"):
+            b = np.floor((t - edges[0]) / widths[0])
+        b = np.where(np.isfinite(b), b, -1).astype(np.int64)
+        b[t == edges[-1]] = n_bins - 1
+    else:
+        b = np.searchsorted(edges, t, side="right") - 1
+        b[t == edges[-1]] = n_bins - 1
+    inside = (b >= 0) & (b < n_bins)
+    flat = (np.arange(k)[:, None] * n_bins + b)[inside]
+    counts = np.bincount(flat, minlength=k * n_bins).reshape(k, n_bins).astype(float)
+    totals = counts.sum(axis=1, keepdims=True)
+    return counts / np.maximum(totals, 1.0)
+
+
+def batch_loss(
+    probs: np.ndarray,
+    observed_counts: np.ndarray,
+    objective: str = "nll",
+    eps: float = 1e-9,
+) -> np.ndarray:
+    """Objective for each candidate row of ``probs`` (lower is better)."""
+    if objective == "nll":
+        # Multinomial NLL per observation; eps keeps empty model bins finite
+        p = (probs + eps) / (1.0 + eps * probs.shape[1])
+        return -(observed_counts[None, :] * np.log(p)).sum(axis=1) / max(observed_counts.sum(), 1.0)
+
+    obs_cdf = np.cumsum(observed_counts) / max(observed_counts.sum(), 1.0)
+    model_cdf = np.cumsum(probs, axis=1)
+    diff = model_cdf - obs_cdf[None, :]
+    if objective == "ks":
+        return np.abs(diff).max(axis=1)
+    if objective == "cdf_l2":
+        return np.sqrt((diff**2).mean(axis=1))
+    raise ValueError(f"objective must be one of {OBJECTIVES}, got {objective!r}")
+
+
+def _to_search(params: np.ndarray, fluid_density: float) -> np.ndarray:
+    x = np.log(params.copy())
+    x[..., 2] = np.log(np.maximum(params[..., 2] - fluid_density, 1e-6))
+    return x
+
+
+def _from_search(x: np.ndarray, fluid_density: float) -> np.ndarray:
+    params = np.exp(x)
+    params[..., 2] = fluid_density + np.exp(x[..., 2])
+    return params
+
+
+@dataclass
+class FitResult:
+    """Best parameters for one observed RunTime distribution."""
+
+    key: Optional[Hashable]
+    params: Dict[str, float]
+    loss: float
+    objective: str
+    n_observed: int
+    n_evaluations: int
+    n_iterations: int
+    fit_time_s: float
+    evaluations_per_s: float
+    converged: bool
+    history: List[float] = field(default_factory=list)
+
+    def to_row(self) -> Dict[str, object]:
+        row = asdict(self)
+        row.pop("history")
+        row.update(row.pop("params"))
+        return row
+
+
+def fit_runtime_distribution(
+    runtimes: Sequence[float],
+    *,
+    model: ForwardModel = ForwardModel(),
+    edges: Optional[np.ndarray] = None,
+    n_bins: int = 40,
+    objective: str = "nll",
+    init: Optional[Mapping[str, float]] = None,
+    fixed: Sequence[str] = (),
+    init_log_sd: float = 0.7,
+    population: int = 64,
+    elite_frac: float = 0.2,
+    smoothing: float = 0.7,
+    max_iter: int = 60,
+    tol: float = 1e-3,
+    seed: Optional[int] = None,
+    key: Optional[Hashable] = None,
+) -> FitResult:
+    """Fit one class's size/density distribution to observed RunTimes (s).
+
+    Parameters
+    ----------
+    runtimes:
+        Observed arrival times (e.g. ADC ``RunTime`` of every ROI of one taxon).
+    edges:
+        Histogram bin edges; defaults to ``n_bins`` equal bins from 0 to the
+        largest observed RunTime. Simulated arrivals outside the edges are
+        ignored, so the fit is conditional on the observed window.
+    fixed:
+        Names from ``PARAM_NAMES`` held at their ``init`` value.
+    population, elite_frac, smoothing, max_iter, tol:
+        Cross-entropy search settings; the search stops when the sampling
+        spread of every free (log) parameter drops below ``tol``.
+    """
+    t_start = time.perf_counter()
+    runtimes = np.asarray(runtimes, dtype=float)
+    runtimes = runtimes[np.isfinite(runtimes)]
+    if edges is None:
+        edges = np.linspace(0.0, float(runtimes.max()) if runtimes.size else 1.0, n_bins + 1)
+    edges = np.asarray(edges, dtype=float)
+    observed, _ = np.histogram(runtimes, bins=edges)
+    observed = observed.astype(float)
+
+    unknown = set(fixed) - set(PARAM_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown fixed parameters: {sorted(unknown)}")
+    start = dict(DEFAULT_INIT)
+    start.update(init or {})
+    free = np.array([name not in fixed for name in PARAM_NAMES])
+
+    rng = np.random.default_rng(seed)
+    draws = model.common_draws()
+    mu = _to_search(np.array([[start[n] for n in PARAM_NAMES]], dtype=float), model.fluid_density)[0]
+    sd = np.where(free, init_log_sd, 0.0)
+    n_elite = max(2, int(round(population * elite_frac)))
+
+    best_x, best_loss = mu.copy(), np.inf
+    history: List[float] = []
+    n_eval = 0
+    converged = False
+    it = 0
+    for it in range(1, max_iter + 1):
+        x = mu + sd * rng.standard_normal((population, len(PARAM_NAMES)))
+        x[0] = best_x if np.isfinite(best_loss) else mu  # keep the incumbent
+        params = _from_search(x, model.fluid_density)
+        loss = batch_loss(binned_probabilities(model.arrival_times(params, draws), edges), observed, objective)
+        n_eval += population
+
+        order = np.argsort(loss)
+        if loss[order[0]] < best_loss:
+            best_loss, best_x = float(loss[order[0]]), x[order[0]].copy()
+        history.append(best_loss)
+
+        elite = x[order[:n_elite]]
+        mu = smoothing * elite.mean(axis=0) + (1 - smoothing) * mu
+        sd = np.where(free, smoothing * elite.std(axis=0) + (1 - smoothing) * sd, 0.0)
+        if np.all(sd[free] < tol):
+            converged = True
+            break
+
+    elapsed = time.perf_counter() - t_start
+    best = _from_search(best_x[None, :], model.fluid_density)[0]
+    return FitResult(
+        key=key,
+        params={name: float(v) for name, v in zip(PARAM_NAMES, best)},
+        loss=best_loss,
+        objective=objective,
+        n_observed=int(runtimes.size),
+        n_evaluations=n_eval,
+        n_iterations=it,
+        fit_time_s=elapsed,
+        evaluations_per_s=n_eval / elapsed if elapsed > 0 else np.nan,
+        converged=converged,
+        history=history,
+    )
+
+
+def _fit_job(job) -> FitResult:
+    key, runtimes, kwargs = job
+    return fit_runtime_distribution(runtimes, key=key, **kwargs)
+
+
+def fit_runtime_distributions(
+    observations: Mapping[Hashable, Sequence[float]],
+    *,
+    max_workers: Optional[int] = None,
+    **fit_kwargs,
+) -> pd.DataFrame:
+    """Fit every entry of ``observations`` (e.g. keyed by (deployment, taxon)).
+
+    Fits run in a process pool (``max_workers=1`` runs in-process). Keyword
+    arguments go to ``fit_runtime_distribution``. Returns one row per key with
+    the fitted parameters, loss, fit time and evaluations per second.
+    """
+    jobs = [(key, np.asarray(rt, dtype=float), fit_kwargs) for key, rt in observations.items()]
+    if max_workers == 1:
+        results = [_fit_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_fit_job, jobs))
+    return pd.DataFrame([r.to_row() for r in results])
+
+
+def observations_from_frame(
+    df: pd.DataFrame,
+    group_cols: Sequence[str],
+    runtime_col: str = "RunTime",
+) -> Dict[Hashable, np.ndarray]:
+    """Group an ROI table (e.g. ADC rows joined to class labels) into RunTime arrays."""
+    grouped = df.groupby(list(group_cols), sort=True)[runtime_col]
+    return {key: group.to_numpy(dtype=float) for key, group in grouped}
+
+
+def fitted_particle_classes(fits: pd.DataFrame, class_col: str = "key") -> pd.DataFrame:
+    """Turn ``fit_runtime_distributions`` output into a ``particle_classes`` table."""
+    out = fits[[class_col, *PARAM_NAMES]].rename(columns={class_col: "size_class"})
+    out["fraction"] = fits["n_observed"] / fits["n_observed"].sum()
+    return out.reset_index(drop=True)
@@ -0,0 +1,127 @@
+"""Ingest, header standardization, summaries and download-path benchmarks."""
+
+from __future__ import annotations
+
+from importlib import util as importlib_util
+from pathlib import Path
+
+from harness import REPO_ROOT, BenchmarkContext, benchmark
+from datasets import CANONICAL_DATASET, MIXED_DATASET
+from notebook_loader import notebook_function
+from standin_server import StandinServer
+
+from adc_header_standardizer import process_hdr_directory
+from ifcb_bin_catalog import BinCatalog
+from ifcb_bin_probe import probe_directory
+from ifcb_roi_summary import summarize_ifcb_directory
+
+
+NOTEBOOKS = REPO_ROOT / "EmpyricalAnalysis" / "Notebooks"
+UTILS = NOTEBOOKS / "Utils"
+BUILD_MASTER_SCRIPT = UTILS / "class_taxonomicSort" / "scripts" / "01_build_master_dataset.py"
+TAXONOMY_MAP = UTILS / "class_taxonomicSort" / "config" / "class_taxonomy_map.csv"
+
+
+def _canonical(ctx: BenchmarkContext) -> Path:
+    return ctx.data_dir / CANONICAL_DATASET
+
+
+def _bins(ctx: BenchmarkContext):
+    return sorted(p.stem for p in _canonical(ctx).glob("*.adc"))
+
+
+def _load_build_master():
+    spec = importlib_util.spec_from_file_location("build_master_dataset", BUILD_MASTER_SCRIPT)
+    module = importlib_util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.build_master
+
+
+@benchmark("ingest.ingest_ifcb", unit="rows")
+def bench_ingest_ifcb(ctx: BenchmarkContext) -> int:
+    ingest_ifcb = notebook_function(UTILS / "IngestIFCBData.ipynb", "ingest_ifcb")
+    data = _canonical(ctx)
+    rows = 0
+    for pid in _bins(ctx):
+        out, _, _ = ingest_ifcb(
+            str(data / f"{pid}.adc"), str(data / f"{pid}.hdr"), str(data / f"{pid}_class_vNone.csv")
+        )
+        rows += len(out)
+    return rows
+
+
+@benchmark("standardize.process_hdr_directory", unit="bins")
+def bench_process_hdr_directory(ctx: BenchmarkContext) -> int:
+    reports = process_hdr_directory(ctx.data_dir / MIXED_DATASET, strict=True)
+    return len(reports)
+
+
+@benchmark("probe.probe_directory", unit="bins")
+def bench_probe_directory(ctx: BenchmarkContext) -> int:
+    return len(probe_directory(ctx.data_dir / MIXED_DATASET))
+
+
+def _setup_build_master(ctx: BenchmarkContext) -> None:
+    ctx.state["build_master"] = _load_build_master()
+
+
+@benchmark("taxonomy.build_master", unit="rows", setup=_setup_build_master)
+def bench_build_master(ctx: BenchmarkContext) -> int:
+    master = ctx.state["build_master"](
+        _canonical(ctx), TAXONOMY_MAP, ctx.work_dir / "master_particles.csv", "*_class_vNone.csv"
+    )
+    return len(master)
+
+
+def _setup_ingested_csvs(ctx: BenchmarkContext) -> None:
+    """Write ingest_ifcb outputs (with RoiType) for the summary scraper."""
+    ingest_ifcb = notebook_function(UTILS / "IngestIFCBData.ipynb", "ingest_ifcb")
+    out_dir = ctx.work_dir / "ingested"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    data = _canonical(ctx)
+    rows = 0
+    for pid in _bins(ctx):
+        out, _, _ = ingest_ifcb(str(data / f"{pid}.adc"), str(data / f"{pid}.hdr"), drop_zero_roi=False)
+        out.to_csv(out_dir / f"{pid}_adc_only.csv", index=False)
+        rows += len(out)
+    ctx.state["ingested_dir"] = out_dir
+    ctx.state["ingested_rows"] = rows
+
+
+@benchmark("summary.summarize_ifcb_directory", unit="rows", setup=_setup_ingested_csvs)
+def bench_summarize_ifcb_directory(ctx: BenchmarkContext) -> int:
+    summarize_ifcb_directory(ctx.state["ingested_dir"])
+    return int(ctx.state["ingested_rows"])
+
+
+def _setup_looktime_records(ctx: BenchmarkContext) -> None:
+    collect = notebook_function(NOTEBOOKS / "LookTimeProportion.ipynb", "_collect_records")
+    ctx.state["records"] = collect(str(_canonical(ctx)))
+
+
+@benchmark("looktime.compute_proportion_inhibited", unit="rows", setup=_setup_looktime_records)
+def bench_compute_proportion_inhibited(ctx: BenchmarkContext) -> int:
+    compute = notebook_function(NOTEBOOKS / "LookTimeProportion.ipynb", "compute_proportion_inhibited")
+    records = ctx.state["records"]
+    compute(records)
+    return sum(len(df) for _, df in records)
+
+
+@benchmark("download.download_ifcb_bins", unit="bins")
+def bench_download_ifcb_bins(ctx: BenchmarkContext) -> int:
+    download = notebook_function(UTILS / "DashboardDataPull.ipynb", "download_ifcb_bins")
+    dest = ctx.work_dir / "downloads"
+    pids = _bins(ctx)
+    with StandinServer(ctx.data_dir) as server:
+        files = download(server.base_url, CANONICAL_DATASET, pids, str(dest), overwrite=True)
+    return len(files)
+
+
+@benchmark("catalog.sync", unit="bins")
+def bench_catalog_sync(ctx: BenchmarkContext) -> int:
+    db_path = ctx.work_dir / "catalog.sqlite"
+    if db_path.exists():
+        db_path.unlink()
+    with StandinServer(ctx.data_dir) as server, BinCatalog(db_path) as catalog:
+        catalog.sync(server.base_url, CANONICAL_DATASET, start="2000-01-01", end="2100-01-01")
+        return len(catalog.query_bins(datasets=[CANONICAL_DATASET]))
@@ -0,0 +1,152 @@
+"""Settling, dead-time and terminal-velocity benchmarks (``particles`` per scale)."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from harness import BenchmarkContext, benchmark
+
+from batched_ols import ols_batched
+from dead_time_sampling import dead_time_mask
+from runtime_resampling import compare_two
+from runtime_sketches import SketchSet, runtime_grid
+from settling_ensemble import DEFAULT_PARAMS, ClassArrays, run_replicate
+from settling_simulation import simulate_settling_dataframe_mixture
+from syringe_settling_model import terminal_velocity_array
+from syringe_transport import FlowSchedule, arrival_times_schedule
+from terminal_velocity_table import get_velocity_table
+
+
+RHO_F = 1025.0
+MU = 1.05e-3
+
+
+def _n(ctx: BenchmarkContext) -> int:
+    return int(ctx.params["particles"])
+
+
+def _particle_arrays(ctx: BenchmarkContext) -> None:
+    rng = np.random.default_rng(0)
+    n = _n(ctx)
+    ctx.state["d"] = rng.lognormal(np.log(20e-6), 0.6, n)
+    ctx.state["rho_p"] = RHO_F + rng.uniform(10.0, 500.0, n)
+    ctx.state["y0"] = rng.uniform(0.0, 0.110998, n)
+    ctx.state["t"] = rng.uniform(0.0, 1200.0, n)
+
+
+@benchmark("simulation.settling_mixture", unit="particles")
+def bench_settling_mixture(ctx: BenchmarkContext) -> int:
+    simulate_settling_dataframe_mixture([5, 10, 20, 40, 80], _n(ctx), 11.0998, random_seed=0)
+    return _n(ctx)
+
+
+@benchmark("simulation.dead_time_mask", unit="particles", setup=_particle_arrays)
+def bench_dead_time_mask(ctx: BenchmarkContext) -> int:
+    dead_time_mask(ctx.state["t"], 0.08)
+    return _n(ctx)
+
+
+@benchmark("simulation.ensemble_replicate", unit="particles")
+def bench_ensemble_replicate(ctx: BenchmarkContext) -> int:
+    classes = ClassArrays.from_frame(pd.DataFrame({
+        "size_class": ["small", "medium", "large"],
+        "mean_diameter_m": [5e-6, 20e-6, 60e-6],
+        "sd_diameter_m": [1e-6, 5e-6, 15e-6],
+        "mean_density_kg_m3": [1050.0, 1080.0, 1100.0],
+        "sd_density_kg_m3": [10.0, 20.0, 30.0],
+        "fraction": [0.6, 0.3, 0.1],
+    }))
+    params = dict(DEFAULT_PARAMS, n_particles=_n(ctx))
+    run_replicate(params, classes, np.random.SeedSequence(0))
+    return _n(ctx)
+
+
+@benchmark("simulation.arrival_times_schedule", unit="particles", setup=_particle_arrays)
+def bench_arrival_times_schedule(ctx: BenchmarkContext) -> int:
+    # Draw / pause / backflush cycle, five times over
+    schedule = FlowSchedule.from_flow_phases([(240.0, 1 / 240), (30.0, 0.0), (20.0, -1 / 60)]).repeat(5)
+    arrival_times_schedule(ctx.state["y0"], 1e-4, schedule)
+    return _n(ctx)
+
+
+@benchmark("velocity.terminal_velocity_array", unit="particles", setup=_particle_arrays)
+def bench_terminal_velocity_array(ctx: BenchmarkContext) -> int:
+    terminal_velocity_array(ctx.state["d"], ctx.state["rho_p"], RHO_F, MU)
+    return _n(ctx)
+
+
+def _velocity_table(ctx: BenchmarkContext) -> None:
+    _particle_arrays(ctx)
+    ctx.state["table"] = get_velocity_table(RHO_F, MU)
+
+
+@benchmark("velocity.table_lookup", unit="particles", setup=_velocity_table)
+def bench_velocity_table_lookup(ctx: BenchmarkContext) -> int:
+    ctx.state["table"](ctx.state["d"], ctx.state["rho_p"])
+    return _n(ctx)
+
+
+# Two RunTime groups of particles / 20 values each, compared with 100 replicates
+STATS_RESAMPLES = 100
+
+
+def _runtime_groups(ctx: BenchmarkContext) -> None:
+    rng = np.random.default_rng(0)
+    n = max(_n(ctx) // 20, 2)
+    ctx.state["a"] = rng.uniform(0.0, 1200.0, n)
+    ctx.state["b"] = rng.uniform(0.0, 1150.0, n)
+
+
+@benchmark("stats.permutation_compare", unit="values", setup=_runtime_groups)
+def bench_permutation_compare(ctx: BenchmarkContext) -> int:
+    compare_two(ctx.state["a"], ctx.state["b"], n_resamples=STATS_RESAMPLES, seed=0)
+    return STATS_RESAMPLES * 2 * len(ctx.state["a"])
+
+
+@benchmark("stats.bootstrap_compare", unit="values", setup=_runtime_groups)
+def bench_bootstrap_compare(ctx: BenchmarkContext) -> int:
+    compare_two(ctx.state["a"], ctx.state["b"], method="bootstrap", n_resamples=STATS_RESAMPLES, seed=0)
+    return STATS_RESAMPLES * 2 * len(ctx.state["a"])
+
+
+SKETCH_GROUPS = 200
+
+
+def _runtime_sketches(ctx: BenchmarkContext) -> None:
+    rng = np.random.default_rng(0)
+    groups = rng.integers(0, SKETCH_GROUPS, _n(ctx))
+    runtime = rng.gamma(2.0, 150.0, _n(ctx))
+    ctx.state["frame"] = pd.DataFrame({"group": groups, "RunTime": runtime})
+    ctx.state["sketches"] = SketchSet.from_frame(ctx.state["frame"], "RunTime", runtime_grid(), "group")
+
+
+@benchmark("stats.sketch_build", unit="values", setup=_runtime_sketches)
+def bench_sketch_build(ctx: BenchmarkContext) -> int:
+    SketchSet.from_frame(ctx.state["frame"], "RunTime", runtime_grid(), "group")
+    return _n(ctx)
+
+
+@benchmark("stats.sketch_distance_matrices", unit="pairs", setup=_runtime_sketches)
+def bench_sketch_distance_matrices(ctx: BenchmarkContext) -> int:
+    ctx.state["sketches"].ks_matrix()
+    ctx.state["sketches"].wasserstein_matrix(allow_tails=True)
+    return SKETCH_GROUPS * (SKETCH_GROUPS - 1) // 2
+
+
+# particles / 100 series of 100 samples each, p_inhib ~ const + time_s with 5 HAC lags
+TREND_SAMPLES = 100
+
+
+def _trend_series(ctx: BenchmarkContext) -> None:
+    rng = np.random.default_rng(0)
+    n_series = max(_n(ctx) // TREND_SAMPLES, 1)
+    t = np.tile(np.arange(TREND_SAMPLES) * 0.25, (n_series, 1))
+    ctx.state["X"] = np.stack([np.ones_like(t), t], axis=-1)
+    ctx.state["y"] = rng.uniform(0.0, 0.2, t.shape)
+
+
+@benchmark("stats.batched_hac_ols", unit="series", setup=_trend_series)
+def bench_batched_hac_ols(ctx: BenchmarkContext) -> int:
+    ols_batched(ctx.state["X"], ctx.state["y"], maxlags=5)
+    return len(ctx.state["y"])
@@ -0,0 +1,61 @@
+"""Deterministic synthetic inputs for each benchmark scale.
+
+Corpora are written once per scale with ``ifcb_synthetic_corpus`` and reused
+until the scale parameters change.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict
+import json
+
+import harness  # noqa: F401  (sets up sys.path)
+from ifcb_synthetic_corpus import CorpusConfig, generate_corpus
+
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"bins": 4, "rois_per_bin": 500, "classes": 10, "particles": 20_000},
+    "medium": {"bins": 40, "rois_per_bin": 2000, "classes": 20, "particles": 1_000_000},
+    "large": {"bins": 200, "rois_per_bin": 4000, "classes": 50, "particles": 10_000_000},
+}
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / ".data"
+
+# Canonical headers with class CSVs: the notebook ingest code reads raw
+# header tokens, so it needs canonical spellings.
+CANONICAL_DATASET = "bench_canonical"
+# Every legacy header spelling, for the standardization benchmarks.
+MIXED_DATASET = "bench_mixed"
+
+
+def ensure_corpus(scale: str, data_dir: Path = DEFAULT_DATA_DIR) -> Path:
+    """Write (or reuse) the corpora for ``scale``; returns the scale root."""
+    params = SCALES[scale]
+    root = data_dir / scale
+    marker = root / "params.json"
+    if marker.exists() and json.loads(marker.read_text()) == params:
+        return root
+
+    generate_corpus(
+        root / CANONICAL_DATASET,
+        CorpusConfig(
+            n_bins=params["bins"],
+            rois_per_bin=params["rois_per_bin"],
+            n_classes=params["classes"],
+            header_style_weights={"canonical": 1.0},
+            seed=1,
+        ),
+    )
+    generate_corpus(
+        root / MIXED_DATASET,
+        CorpusConfig(
+            n_bins=params["bins"],
+            rois_per_bin=params["rois_per_bin"],
+            n_classes=params["classes"],
+            write_class_csv=False,
+            seed=2,
+        ),
+    )
+    marker.write_text(json.dumps(params))
+    return root
@@ -0,0 +1,201 @@
+"""Minimal benchmark harness: registry, timing, peak memory and result files.
+
+Design goals:
+- No extra dependencies: wall time from ``time.perf_counter``, peak traced
+  allocation (Python + NumPy buffers) from ``tracemalloc``.
+- Every benchmark runs in the same process, so the process-lifetime peak RSS
+  says nothing about one benchmark. ``peak_rss_delta_mb`` is instead the
+  peak RSS during the timed runs minus the RSS just before them, from the
+  kernel high-water mark reset per benchmark (Linux; None elsewhere).
+- Each benchmark returns how many units (rows, bins, particles) it processed,
+  so results are reported as throughput and comparable across scales.
+- Results are written to ``benchmarks/results/<commit>.json`` and any two
+  result files can be compared.
+"""
+
+from __future__ import annotations
+
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Make the flat-import modules importable the same way the notebooks do
+for _p in (
+    REPO_ROOT / "EmpyricalAnalysis" / "Notebooks" / "Utils",
+    REPO_ROOT / "EmpyricalAnalysis" / "Notebooks",
+    REPO_ROOT / "Modeling" / "Notebooks",
+):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
+from ifcb_stage_timing import current_rss_mb, high_water_rss_mb, reset_high_water  # noqa: E402
+
+
+@dataclass
+class BenchmarkSpec:
+    name: str
+    unit: str
+    func: Callable[["BenchmarkContext"], int]
+    setup: Optional[Callable[["BenchmarkContext"], None]] = None
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    scale: str
+    unit: str
+    units: int
+    repeats: int
+    best_s: float
+    median_s: float
+    throughput_per_s: float
+    peak_traced_mb: float
+    peak_rss_delta_mb: Optional[float]
+    error: Optional[str] = None
+
+
+@dataclass
+class BenchmarkContext:
+    """What a benchmark gets: the scale parameters and a scratch area."""
+
+    scale: str
+    params: Dict[str, int]
+    data_dir: Path
+    work_dir: Path
+    state: Dict[str, object] = field(default_factory=dict)
+
+
+REGISTRY: Dict[str, BenchmarkSpec] = {}
+
+
+def benchmark(name: str, unit: str, setup: Optional[Callable[[BenchmarkContext], None]] = None):
+    """Register ``func(ctx) -> units processed`` under ``name``."""
+    def decorator(func: Callable[[BenchmarkContext], int]):
+        REGISTRY[name] = BenchmarkSpec(name=name, unit=unit, func=func, setup=setup)
+        return func
+    return decorator
+
+
+def _start_rss() -> Optional[float]:
+    """RSS before the timed runs, with the high-water mark reset to it."""
+    rss0 = current_rss_mb()
+    return rss0 if rss0 is not None and reset_high_water() else None
+
+
+def _peak_rss_delta_mb(rss0: Optional[float]) -> Optional[float]:
+    hwm = high_water_rss_mb() if rss0 is not None else None
+    return hwm - rss0 if hwm is not None else None
+
+
+def run_one(spec: BenchmarkSpec, ctx: BenchmarkContext, repeats: int = 3, quiet: bool = True) -> BenchmarkResult:
+    """Run ``spec`` ``repeats`` times; memory is traced on the first run only."""
+    sink = io.StringIO() if quiet else sys.stdout
+    times: List[float] = []
+    units = 0
+    peak = 0
+    rss0 = None
+    try:
+        with redirect_stdout(sink):
+            if spec.setup is not None:
+                spec.setup(ctx)
+            rss0 = _start_rss()
+            for k in range(repeats):
+                if k == 0:
+                    tracemalloc.start()
+                t0 = time.perf_counter()
+                units = spec.func(ctx)
+                times.append(time.perf_counter() - t0)
+                if k == 0:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+    except Exception as e:  # keep the rest of the suite running
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return BenchmarkResult(spec.name, ctx.scale, spec.unit, 0, len(times), float("nan"),
+                               float("nan"), float("nan"), float("nan"), _peak_rss_delta_mb(rss0),
+                               error=f"{type(e).__name__}: {e}")
+
+    # The first (traced) run is slower; time the others when there are any
+    timed = times[1:] or times
+    best = min(timed)
+    return BenchmarkResult(
+        name=spec.name,
+        scale=ctx.scale,
+        unit=spec.unit,
+        units=int(units),
+        repeats=len(timed),
+        best_s=best,
+        median_s=statistics.median(timed),
+        throughput_per_s=units / best if best > 0 else float("nan"),
+        peak_traced_mb=peak / 1e6,
+        peak_rss_delta_mb=_peak_rss_delta_mb(rss0),
+    )
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        )
+        rev = out.stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+            capture_output=True, text=True,
+        ).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results: List[BenchmarkResult], out_dir: Path = RESULTS_DIR, revision: Optional[str] = None) -> Path:
+    """Write results to ``<out_dir>/<revision>.json`` (merging with earlier scales)."""
+    revision = revision or git_revision()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{revision}.json"
+    payload = {"revision": revision, "machine": {}, "results": []}
+    if path.exists():
+        payload = json.loads(path.read_text())
+    payload["machine"] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+    keep = {(r["name"], r["scale"]) for r in map(asdict, results)}
+    payload["results"] = [r for r in payload["results"] if (r["name"], r["scale"]) not in keep]
+    payload["results"].extend(asdict(r) for r in results)
+    path.write_text(json.dumps(payload, indent=2))
+    return path
+
+
+def compare_results(base_path: Path, new_path: Path) -> List[Dict[str, object]]:
+    """Per-benchmark throughput and peak-memory ratios (new / base)."""
+    base = {(r["name"], r["scale"]): r for r in json.loads(Path(base_path).read_text())["results"]}
+    rows = []
+    for r in json.loads(Path(new_path).read_text())["results"]:
+        b = base.get((r["name"], r["scale"]))
+        if b is None:
+            continue
+        rows.append({
+            "name": r["name"],
+            "scale": r["scale"],
+            "unit": r["unit"],
+            "base_per_s": b["throughput_per_s"],
+            "new_per_s": r["throughput_per_s"],
+            "speedup": r["throughput_per_s"] / b["throughput_per_s"] if b["throughput_per_s"] else float("nan"),
+            "mem_ratio": r["peak_traced_mb"] / b["peak_traced_mb"] if b["peak_traced_mb"] else float("nan"),
+        })
+    return rows
@@ -0,0 +1,63 @@
+"""Load function definitions from a notebook without running its analysis cells.
+
+Several production functions (``ingest_ifcb``, ``compute_proportion_inhibited``,
+``download_ifcb_bins``) only exist inside notebooks. To benchmark them as
+written, code cells are parsed and only their imports, function and class
+definitions are executed, in notebook order, so a later redefinition wins just
+as it does after "Run All".
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable
+import ast
+import json
+
+
+_NAMESPACES: Dict[str, Dict[str, object]] = {}
+
+_KEEP_NODES = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def load_notebook_namespace(nb_path: str | Path) -> Dict[str, object]:
+    """Namespace with every import/def/class from the notebook's code cells."""
+    nb = json.loads(Path(nb_path).read_text(encoding="utf-8"))
+    namespace: Dict[str, object] = {"__name__": f"notebook:{Path(nb_path).stem}"}
+    for cell in nb.get("cells", []):
+        if cell.get("cell_type") != "code":
+            continue
+        source = "".join(cell.get("source", []))
+        # Drop IPython magics / shell escapes that are not valid Python
+        lines = [ln for ln in source.splitlines() if not ln.lstrip().startswith(("%", "!"))]
+        try:
+            tree = ast.parse("\n".join(lines))
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if not isinstance(node, _KEEP_NODES):
+                continue
+            module = ast.Module(body=[node], type_ignores=[])
+            try:
+                exec(compile(module, str(nb_path), "exec"), namespace)
+            except ImportError:
+                # Optional plotting/stat dependencies are not needed to benchmark
+                continue
+    return namespace
+
+
+def load_notebook_functions(nb_path: str | Path, names: Iterable[str]) -> Dict[str, object]:
+    """The named callables from ``nb_path``; raises KeyError if one is missing."""
+    namespace = load_notebook_namespace(nb_path)
+    missing = [n for n in names if n not in namespace]
+    if missing:
+        raise KeyError(f"{Path(nb_path).name} does not define: {missing}")
+    return {n: namespace[n] for n in names}
+
+
+def notebook_function(nb_path: str | Path, name: str):
+    """One function from a notebook (namespaces are cached per notebook)."""
+    key = str(Path(nb_path).resolve())
+    if key not in _NAMESPACES:
+        _NAMESPACES[key] = load_notebook_namespace(nb_path)
+    return _NAMESPACES[key][name]
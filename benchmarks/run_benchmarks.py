@@ -0,0 +1,90 @@
+"""Run the benchmark suite and record throughput / peak memory per commit.
+
+Usage:
+    python benchmarks/run_benchmarks.py --scale small
+    python benchmarks/run_benchmarks.py --scale medium --filter ingest --repeat 5
+    python benchmarks/run_benchmarks.py --compare results/abc1234.json results/def5678.json
+
+Synthetic corpora are generated once per scale under ``benchmarks/.data/``;
+results go to ``benchmarks/results/<commit>.json``.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import argparse
+import fnmatch
+import shutil
+import tempfile
+
+from harness import REGISTRY, RESULTS_DIR, BenchmarkContext, compare_results, git_revision, run_one, save_results
+from datasets import DEFAULT_DATA_DIR, SCALES, ensure_corpus
+import bench_pipeline  # noqa: F401  (registers benchmarks)
+import bench_simulation  # noqa: F401
+
+
+def _print_header() -> None:
+    print(f"{'benchmark':<38} {'units':>10} {'best s':>9} {'per s':>12} {'traced MB':>10} {'+rss MB':>8}")
+
+
+def _print_results(results) -> None:
+    for r in results:
+        if r.error:
+            print(f"{r.name:<38} ERROR {r.error}")
+            continue
+        rss = f"{r.peak_rss_delta_mb:8.0f}" if r.peak_rss_delta_mb is not None else f"{'-':>8}"
+        print(f"{r.name:<38} {r.units:>10,d} {r.best_s:>9.3f} {r.throughput_per_s:>12,.0f} "
+              f"{r.peak_traced_mb:>10.1f} {rss}")
+
+
+def _print_comparison(rows) -> None:
+    print(f"{'benchmark':<38} {'scale':<7} {'base per s':>12} {'new per s':>12} {'speedup':>8} {'mem':>6}")
+    for r in rows:
+        print(f"{r['name']:<38} {r['scale']:<7} {r['base_per_s']:>12,.0f} {r['new_per_s']:>12,.0f} "
+              f"{r['speedup']:>7.2f}x {r['mem_ratio']:>5.2f}x")
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Run the pipeline and simulation benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--filter", type=str, default=None, help="Glob on benchmark names (e.g. 'ingest.*')")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (first run traces memory)")
+    parser.add_argument("--data-dir", type=str, default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output-dir", type=str, default=str(RESULTS_DIR))
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        _print_comparison(compare_results(Path(args.compare[0]), Path(args.compare[1])))
+        return
+
+    specs = [s for name, s in sorted(REGISTRY.items())
+             if args.filter is None or fnmatch.fnmatch(name, args.filter) or args.filter in name]
+    if args.list:
+        for s in specs:
+            print(f"{s.name} ({s.unit})")
+        return
+
+    data_root = ensure_corpus(args.scale, Path(args.data_dir))
+    work_dir = Path(tempfile.mkdtemp(prefix="ifcb_bench_"))
+    results = []
+    _print_header()
+    try:
+        for spec in specs:
+            ctx = BenchmarkContext(args.scale, SCALES[args.scale], data_root, work_dir / spec.name)
+            ctx.work_dir.mkdir(parents=True, exist_ok=True)
+            results.append(run_one(spec, ctx, repeats=args.repeat))
+            _print_results(results[-1:])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if not args.no_save:
+        revision = git_revision()
+        path = save_results(results, Path(args.output_dir), revision)
+        print(f"\nSaved {len(results)} results for {revision} ({args.scale}) to {path}")
+
+
+if __name__ == "__main__":
+    _cli()
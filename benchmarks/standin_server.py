@@ -0,0 +1,130 @@
+"""Local stand-in for the IFCB dashboard, serving a synthetic corpus over HTTP.
+
+Covers the two routes the download code uses:
+
+- ``/api/export_metadata/<dataset>``: CSV with pid, sample_time, skip for the
+  bins found in ``<root>/<dataset>/`` (filtered by start_date/end_date).
+- ``/<dataset>/<file>``: raw .adc/.hdr/class CSV bytes, 404 if missing.
+
+Runs in a background thread on an ephemeral port, so benchmarks can exercise
+``requests``-based download paths without touching the real dashboard.
+"""
+
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlparse
+import argparse
+import re
+import threading
+
+import pandas as pd
+
+
+_PID_TIME = re.compile(r"D(\d{8}T\d{6})")
+
+
+def export_metadata_csv(dataset_dir: Path, start: Optional[str] = None, end: Optional[str] = None) -> str:
+    """Dashboard-style export_metadata CSV for every .adc in ``dataset_dir``."""
+    rows = []
+    for adc in sorted(dataset_dir.glob("*.adc")):
+        m = _PID_TIME.search(adc.stem)
+        if not m:
+            continue
+        rows.append({"pid": adc.stem, "sample_time": pd.to_datetime(m.group(1), format="%Y%m%dT%H%M%S", utc=True), "skip": 0})
+    df = pd.DataFrame(rows, columns=["pid", "sample_time", "skip"])
+    if start:
+        df = df[df["sample_time"] >= pd.to_datetime(start, utc=True)]
+    if end:
+        df = df[df["sample_time"] <= pd.to_datetime(end, utc=True)]
+    df["sample_time"] = df["sample_time"].dt.strftime("%Y-%m-%d %H:%M:%S+00:00")
+    return df.to_csv(index=False)
+
+
+def _make_handler(root: Path):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: bytes, content_type: str = "application/octet-stream") -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):  # noqa: N802 (http.server API)
+            url = urlparse(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+
+            if len(parts) == 3 and parts[0] == "api" and parts[1] == "export_metadata":
+                dataset_dir = root / parts[2]
+                if not dataset_dir.is_dir():
+                    return self._send(404, b"unknown dataset", "text/plain")
+                q = parse_qs(url.query)
+                csv_text = export_metadata_csv(
+                    dataset_dir, q.get("start_date", [None])[0], q.get("end_date", [None])[0]
+                )
+                return self._send(200, csv_text.encode(), "text/csv")
+
+            if len(parts) == 2:
+                path = (root / parts[0] / parts[1]).resolve()
+                if root in path.parents and path.is_file():
+                    return self._send(200, path.read_bytes())
+            return self._send(404, b"not found", "text/plain")
+
+        def log_message(self, *args):  # keep benchmark output clean
+            pass
+
+    return Handler
+
+
+class StandinServer:
+    """Serve ``root`` (one sub-directory per dataset) on ``127.0.0.1``.
+
+    Use as a context manager; ``base_url`` is valid inside the block.
+    """
+
+    def __init__(self, root: str | Path, port: int = 0):
+        self.root = Path(root).resolve()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self.root))
+        # Short poll interval so shutdown() does not add ~0.5 s to every timing
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Serve a synthetic corpus as a stand-in IFCB dashboard")
+    parser.add_argument("root", type=str, help="Directory with one sub-directory per dataset")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = StandinServer(args.root, port=args.port)
+    print(f"Serving {server.root} at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    _cli()